@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Scaling Benchmark for the Facebook Message Processor
+
+Generates synthetic exports of increasing size with generate_sample_export.py
+and times every stage of the pipeline on them: parsing, DataFrame conversion,
+summary statistics, visualizer start-up and each dashboard figure builder.
+
+It also checks the import time of the parser module in a fresh interpreter
+against a budget, and that importing it does not pull in the dashboard stack.
+
+Results are written as JSON to benchmark_results/ so that a later run can be
+compared against them with --compare to spot regressions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from generate_sample_export import generate_export
+from fb_message_processor import FacebookMessageParser
+from fb_message_visualizer import FacebookMessageVisualizer
+
+
+RESULTS_DIR = Path(__file__).parent / "benchmark_results"
+
+# A stage counts as a regression when it is this much slower than the baseline...
+REGRESSION_RATIO = 1.25
+# ...and slower by at least this many seconds, so timer noise is ignored
+REGRESSION_MIN_SECONDS = 0.005
+
+# Import of the parser module (the --parse-only path) must stay under this...
+IMPORT_BUDGET_SECONDS = 0.8
+# ...and must not load any of these, which only the dashboard needs
+DASHBOARD_MODULES = ('plotly', 'dash', 'dash_bootstrap_components', 'bs4')
+IMPORT_REPEATS = 5
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(fn, memory=False):
+    """Run ``fn`` with its output silenced; return (result, seconds, peak MB)."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def benchmark_size(size, fmt, data_dir, workers=1, memory=False):
+    """Benchmark every stage on an export of ``size`` messages."""
+    export_dir = Path(data_dir) / f"export_{fmt}_{size}"
+    if not export_dir.exists():
+        n_threads = min(2000, max(10, size // 2000))
+        generate_export(export_dir, n_messages=size, n_threads=n_threads, fmt=fmt)
+
+    timings = []
+
+    def record(stage, fn, figure=False):
+        result, seconds, peak_mb = measure(fn, memory)
+        timings.append({'size': size, 'format': fmt, 'stage': stage,
+                        'seconds': round(seconds, 6),
+                        'peak_mb': round(peak_mb, 2) if peak_mb is not None else None})
+        line = f"  {stage:<28} {seconds:10.4f} s" + (f" {peak_mb:10.1f} MB" if peak_mb is not None else "")
+        if figure:
+            # JSON size of the figure, as a Dash callback would send it
+            timings[-1]['payload_bytes'] = len(result.to_json())
+            line += f" {timings[-1]['payload_bytes'] / 1e3:10.1f} kB"
+        print(line)
+        return result
+
+    parser = FacebookMessageParser()
+    record('parse_directory', lambda: parser.parse_directory(export_dir, workers=workers))
+    df = record('to_dataframe', parser.to_dataframe)
+    record('get_summary_stats', parser.get_summary_stats)
+
+    visualizer = record('visualizer_init', lambda: FacebookMessageVisualizer(df))
+    for graph_id, _, _, dim in FacebookMessageVisualizer.HISTOGRAMS:
+        record(f'figure:{graph_id}', lambda dim=dim: visualizer.create_histogram_figure(
+            visualizer.histogram_data(dim), 'category', 'count'), figure=True)
+    record('figure:main-scatter', visualizer.create_main_scatter_plot, figure=True)
+    record('figure:time-density', visualizer.create_time_density_plot, figure=True)
+    record('figure:date-density', visualizer.create_date_density_plot, figure=True)
+
+    return timings
+
+
+def measure_import(module, forbidden=DASHBOARD_MODULES, repeats=IMPORT_REPEATS):
+    """Import ``module`` in fresh interpreters; return (best seconds, forbidden modules loaded)."""
+    best, loaded = None, set()
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE.format(module=module, forbidden=tuple(forbidden))],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        best = probe['seconds'] if best is None else min(best, probe['seconds'])
+        loaded.update(probe['loaded'])
+    return best, sorted(loaded)
+
+
+def check_import_budget(budget):
+    """Time the parser import and return (result row, list of budget violations)."""
+    seconds, loaded = measure_import('fb_message_processor')
+    print(f"  {'import:fb_message_processor':<28} {seconds:10.4f} s (budget {budget:.2f} s)")
+    violations = []
+    if seconds > budget:
+        violations.append(f"importing fb_message_processor took {seconds:.3f}s, over the {budget:.2f}s budget")
+    if loaded:
+        violations.append(f"importing fb_message_processor loaded dashboard modules: {', '.join(loaded)}")
+    row = {'size': 0, 'format': '-', 'stage': 'import:fb_message_processor',
+           'seconds': round(seconds, 6), 'peak_mb': None}
+    return row, violations
+
+
+def load_results(path):
+    """Load a results file; ``'latest'`` picks the newest one in RESULTS_DIR."""
+    if path == 'latest':
+        candidates = sorted(RESULTS_DIR.glob("bench_*.json"))
+        if not candidates:
+            return None
+        path = candidates[-1]
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, baseline):
+    """Print per-stage ratios against ``baseline``; return the regressions."""
+    previous = {(r['size'], r['format'], r['stage']): r for r in baseline['results']}
+    regressions = []
+
+    print(f"\n=== Comparison with {baseline['meta']['created']} ===")
+    for r in results:
+        old = previous.get((r['size'], r['format'], r['stage']))
+        if not old:
+            continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        slower = ratio > REGRESSION_RATIO and r['seconds'] - old['seconds'] > REGRESSION_MIN_SECONDS
+        flag = "  REGRESSION" if slower else ""
+        print(f"  {r['size']:>10,} {r['format']:<5} {r['stage']:<28} "
+              f"{old['seconds']:9.4f} -> {r['seconds']:9.4f} s ({ratio:5.2f}x){flag}")
+        if slower:
+            regressions.append(r)
+
+    return regressions
+
+
+def main():
+    """Main function to parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the Facebook message pipeline on synthetic exports')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Export sizes in messages (default: 1000 10000 100000)')
+    parser.add_argument('--format', '-f', choices=['html', 'json'], default='html', help='Export format (default: html)')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Worker processes for parsing (default: 1)')
+    parser.add_argument('--memory', action='store_true', help='Also record peak memory with tracemalloc (slower)')
+    parser.add_argument('--data-dir', help='Keep generated exports here and reuse them (default: temporary directory)')
+    parser.add_argument('--compare', metavar='RESULTS',
+                        help="Compare with an earlier results file, or 'latest' for the newest one")
+    parser.add_argument('--no-save', action='store_true', help='Do not write a results file')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_SECONDS,
+                        help=f'Maximum import time of the parser module in seconds (default: {IMPORT_BUDGET_SECONDS})')
+
+    args = parser.parse_args()
+
+    # Read the baseline before this run's file is written
+    baseline = load_results(args.compare) if args.compare else None
+
+    print("\n=== Import time ===")
+    import_row, violations = check_import_budget(args.import_budget)
+    results = [import_row]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        for size in args.sizes:
+            print(f"\n=== {size:,} messages ({args.format}) ===")
+            results.extend(benchmark_size(size, args.format, data_dir, args.workers, args.memory))
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'workers': args.workers,
+            'memory': args.memory,
+            'import_budget': args.import_budget,
+        },
+        'results': results,
+    }
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out_path = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {out_path}")
+
+    failed = bool(violations)
+    for violation in violations:
+        print(f"\nIMPORT BUDGET EXCEEDED: {violation}")
+
+    if args.compare:
+        if baseline is None:
+            print(f"\nNo results to compare with: {args.compare}")
+        elif compare(results, baseline):
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ This script demonstrates how to use the FacebookMessageParser and FacebookMessag
 
 import sys
 from pathlib import Path
-from fb_message_processor import FacebookMessageParser, FacebookMessageVisualizer
+from fb_message_processor import FacebookMessageParser, MessageFrame, top_conversations
 
 def example_usage():
     """Example of how to use the Facebook message processor."""
@@ -50,7 +50,7 @@ def example_usage():
     
     # Show top conversations by message count
     print(f"\nTop 5 conversations by message count:")
-    top_threads = df['thread_title'].value_counts().head()
+    top_threads = top_conversations(df)
     for thread, count in top_threads.items():
         print(f"  {thread[:50]}{'...' if len(thread) > 50 else ''}: {count} messages")
     
@@ -65,6 +65,9 @@ def example_usage():
     print("Starting web dashboard at http://localhost:8050")
     print("Press Ctrl+C to stop the server")
     
+    # Imported here so that parsing does not wait for plotly and dash to load
+    from fb_message_visualizer import FacebookMessageVisualizer
+    
     try:
         visualizer = FacebookMessageVisualizer(df)
         visualizer.run(debug=False, port=8050)
@@ -74,7 +77,6 @@ def example_usage():
 def test_with_sample_data():
     """Create and test with sample data if no real data is available."""
     
-    import pandas as pd
     from datetime import datetime, timedelta
     import random
     
@@ -99,23 +101,15 @@ def test_with_sample_data():
             'file_path': f"sample_file_{i}.html"
         })
     
-    # Create DataFrame
-    df = pd.DataFrame(sample_messages)
-    
-    # Add derived columns
-    df['date'] = df['timestamp'].dt.date
-    df['hour'] = df['timestamp'].dt.hour
-    df['weekday'] = df['timestamp'].dt.day_name()
-    df['month'] = df['timestamp'].dt.month
-    df['year'] = df['timestamp'].dt.year
-    df['message_length'] = df['content'].str.len()
-    df['word_count'] = df['content'].str.split().str.len()
-    df['reaction_count'] = df['reactions'].str.len()
+    # Create DataFrame; date, hour, weekday and the other derived columns
+    # are computed when first read
+    df = MessageFrame(sample_messages)
     
     print(f"Generated {len(df)} sample messages")
     
     # Start visualizer with sample data
     print("Starting visualizer with sample data...")
+    from fb_message_visualizer import FacebookMessageVisualizer
     visualizer = FacebookMessageVisualizer(df)
     visualizer.run(debug=False, port=8050)
 
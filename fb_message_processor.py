@@ -2,121 +2,245 @@
 """
 Facebook Message HTML Processor and Visualizer
 
-This script processes Facebook message HTML files from a Facebook data export
-and creates an interactive visualization dashboard similar to the FBMessage project.
+This script processes Facebook message HTML or JSON files from a Facebook data
+export and creates an interactive visualization dashboard similar to the FBMessage project.
 
 Features:
-- Parse HTML message files
+- Parse HTML and JSON message files
 - Extract message data (sender, timestamp, content, reactions)
 - Create interactive visualizations using Plotly Dash
 - Display message statistics and patterns
+
+The dashboard itself lives in fb_message_visualizer and is only imported when
+it is started, so parsing never pays for loading plotly and dash.
 """
 
 import os
 import re
+import shutil
 import json
+import pickle
+import hashlib
+import sqlite3
+import threading
+import time
+import cProfile
+import tracemalloc
+import io
+import zipfile
+import heapq
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from pathlib import Path
-from collections import defaultdict, Counter
+from pathlib import Path, PurePosixPath
+from types import SimpleNamespace
+from collections import defaultdict, Counter, deque
+from operator import index, itemgetter
+from array import array
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-# Web scraping and HTML parsing
-from bs4 import BeautifulSoup
+# HTML parsing; bs4 is imported by the bs4 backend when it is used
+from lxml import etree
 import html as py_html  # Rename built-in html import to avoid conflict
 
-# Visualization libraries
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import dash
-from dash import dcc, html, Input, Output, callback_context
-import dash_bootstrap_components as dbc
-
 # Text processing
 import unicodedata
 
+# Optional: Parquet dataset export and reload, see MessageDataset. pyarrow is
+# imported on first use by _import_pyarrow(), it is slower to load than the parser
+pa = pa_ds = None
+
+# Names that moved to fb_message_visualizer, still importable from here
+_VISUALIZER_NAMES = ('FacebookMessageVisualizer', 'AggregateCube')
+
+
+def __getattr__(name):
+    """Load the dashboard module only when one of its classes is asked for."""
+    if name in _VISUALIZER_NAMES:
+        import fb_message_visualizer
+        return getattr(fb_message_visualizer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _import_pyarrow():
+    """Import pyarrow on first use; return False if it is not installed."""
+    global pa, pa_ds
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset
+        except ImportError:
+            return False
+        pa, pa_ds = pyarrow, pyarrow.dataset
+    return True
+
 
 class FacebookMessageParser:
-    """Parse Facebook message HTML files and extract structured data."""
+    """Parse Facebook message HTML and JSON files and extract structured data."""
     
-    def __init__(self):
-        self.messages = []
+    HTML_BACKENDS = ('lxml', 'bs4')
+    
+    # message_1.html, message_2.html, ... of one conversation share its inbox folder
+    THREAD_FILE = re.compile(r'^message_\d+\.(?:html|json)$', re.IGNORECASE)
+    
+    def __init__(self, backend='lxml', cache_dir=None, search_index=False, metrics=None):
+        if backend not in self.HTML_BACKENDS:
+            raise ValueError(f"Unknown HTML backend: {backend} (expected one of {', '.join(self.HTML_BACKENDS)})")
+        self.backend = backend
+        # Optional on-disk cache of per-file results, see ParseCache
+        self.cache = ParseCache(cache_dir) if cache_dir else None
+        # Optional full-text index over message content, see search(); kept with
+        # the cache, so threads whose files did not change are not indexed again
+        self.search_index = None
+        if search_index:
+            self.search_index = (MessageSearchIndex(self.cache.search_path, keyed=True)
+                                 if self.cache is not None else MessageSearchIndex())
+        self.messages = MessageStore()
         self.participants = set()
+        # Inbox folder id -> rows of the thread's messages in the store, see thread_key
         self.threads = {}
+        self.timestamp_parser = TimestampParser()
+        self.text_normalizer = TextNormalizer()
+        # Footer timestamps that matched none of the known formats
+        self.timestamp_failures = 0
+        # Messages skipped as copies of ones already parsed, e.g. from an older export
+        self.duplicate_messages = 0
+        # Stage timers, throughput and error counters, see ParseMetrics
+        self.metrics = metrics if metrics is not None else ParseMetrics()
         
     def normalize_text(self, text):
-        """Normalize Unicode text that may be improperly encoded."""
+        """Normalize Unicode text that may be improperly encoded, see TextNormalizer."""
         if not text:
             return ""
         
-        # Handle Facebook's encoding issues
-        try:
-            # First try to decode if it's bytes
-            if isinstance(text, bytes):
-                text = text.decode('utf-8', errors='ignore')
-            
-            # Normalize Unicode
-            text = unicodedata.normalize('NFKD', text)
-            
-            # Handle HTML entities
-            text = py_html.unescape(text)  # Use built-in html.unescape via py_html
-            
-            return text.strip()
-        except Exception as e:
-            print(f"Warning: Could not normalize text: {e}")
-            return str(text) if text else ""
+        with self.metrics.stage('normalize'):
+            try:
+                return self.text_normalizer.normalize(text)
+            except Exception as e:
+                self.metrics.record_error('normalize', str(e))
+                return str(text)
+    
+    def normalize_texts(self, texts, memo=False):
+        """Normalize a batch of texts, see TextNormalizer.normalize_many."""
+        with self.metrics.stage('normalize'):
+            try:
+                return self.text_normalizer.normalize_many(texts, memo=memo)
+            except Exception as e:
+                self.metrics.record_error('normalize', str(e), count=len(texts))
+                return [str(text) if text else "" for text in texts]
     
     def parse_timestamp(self, timestamp_str):
         """Parse Facebook timestamp format."""
+        return self.timestamp_parser.parse(timestamp_str)
+    
+    def extract_html_file(self, file_path, data=None):
+        """Extract thread title, participants and messages from a single HTML file.
+
+        Unlike ``parse_html_file`` this does not touch the parser state, so it
+        can safely run in a worker process. ``data`` is the file contents when
+        they were already read (see FilePrefetcher). Returns ``None`` if the
+        file could not be read or parsed.
+        """
         try:
-            # Remove timezone info for now - Facebook format: "Oct 25, 2022 10:03:52 am"
-            timestamp_str = timestamp_str.strip()
-            
-            # Try multiple formats
-            formats = [
-                "%b %d, %Y %I:%M:%S %p",  # Oct 25, 2022 10:03:52 am
-                "%B %d, %Y %I:%M:%S %p",  # October 25, 2022 10:03:52 am
-                "%m/%d/%Y %I:%M:%S %p",   # 10/25/2022 10:03:52 am
-                "%Y-%m-%d %H:%M:%S",      # 2022-10-25 10:03:52
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(timestamp_str, fmt)
-                except ValueError:
-                    continue
-            
-            # If all formats fail, try to extract date components
-            print(f"Warning: Could not parse timestamp: {timestamp_str}")
-            return None
-            
+            if self.backend == 'lxml':
+                return self._extract_html_lxml(file_path, data)
+            return self._extract_html_bs4(file_path, data)
         except Exception as e:
-            print(f"Error parsing timestamp '{timestamp_str}': {e}")
+            self.metrics.record_error('file', f"{file_path}: {e}")
             return None
     
-    def parse_html_file(self, file_path):
-        """Parse a single Facebook message HTML file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+    def _make_message(self, thread_title, sender_name, text_blocks, reactions, timestamp_str, file_path):
+        """Build a message record from the raw fields of one ``_a6-g`` section.
+        
+        Shared by both HTML backends so they apply identical filtering.
+        Returns ``None`` for sections that are not real messages.
+        """
+        # Skip if this is a system message (like group settings)
+        if any(phrase in sender_name.lower() for phrase in ['group invite link', 'participants:']):
+            return None
+        
+        message_text = ""
+        for text in text_blocks:
+            text = text.strip()
+            if text and not text.startswith('❤') and not text.startswith('👍') and not text.startswith('😮'):
+                message_text = text
+                break
+        
+        # Only keep messages with content and timestamp
+        if not (message_text and timestamp_str):
+            return None
+        
+        # The texts are normalized and the footer string parsed later, for the whole file at once
+        return {
+            'thread_title': thread_title,
+            'sender_name': sender_name,
+            'timestamp': timestamp_str,
+            'content': message_text,
+            'reactions': reactions,
+            'file_path': str(file_path)
+        }
+    
+    def _html_file_result(self, thread_title, participants, thread_messages):
+        """Normalize the texts and parse the footer timestamps of a file in batches and build its result."""
+        thread_messages = self._normalize_messages(thread_messages)
+        with self.metrics.stage('timestamp_parse'):
+            timestamps = self.timestamp_parser.parse_many([msg['timestamp'] for msg in thread_messages])
+        
+        messages = []
+        for message, timestamp in zip(thread_messages, timestamps):
+            if timestamp is not None:
+                message['timestamp'] = timestamp
+                messages.append(message)
+        
+        return {
+            'thread_title': thread_title,
+            'participants': participants,
+            'messages': messages,
+            'timestamp_failures': len(thread_messages) - len(messages)
+        }
+    
+    def _normalize_messages(self, thread_messages):
+        """Normalize the senders, contents and reactions of a file's messages in batches.
+        
+        Messages whose content is left empty are dropped.
+        """
+        senders = self.normalize_texts([msg['sender_name'] for msg in thread_messages], memo=True)
+        contents = self.normalize_texts([msg['content'] for msg in thread_messages])
+        # Reactions (emoji and name) repeat like names do, so they are memoized too
+        reactions = iter(self.normalize_texts(
+            [reaction for msg in thread_messages for reaction in msg['reactions']], memo=True))
+        kept = []
+        for message, sender_name, content in zip(thread_messages, senders, contents):
+            message_reactions = [next(reactions) for _ in message['reactions']]
+            if content:
+                message['sender_name'] = sender_name
+                message['content'] = content
+                message['reactions'] = message_reactions
+                kept.append(message)
+        return kept
+    
+    def _extract_html_bs4(self, file_path, data=None):
+        """Reference backend: build a full BeautifulSoup tree and search it."""
+        from bs4 import BeautifulSoup
+        
+        with self.metrics.stage('read'):
+            with _open_message_file(file_path, text=True, data=data) as f:
                 content = f.read()
-            
+        
+        with self.metrics.stage('tree_build'):
             soup = BeautifulSoup(content, 'html.parser')
-            
+        
+        with self.metrics.stage('extract'):
             # Extract thread title
             title_element = soup.find('h1')
             thread_title = self.normalize_text(title_element.get_text()) if title_element else "Unknown Thread"
             
             # Extract participants
+            participants = []
             participants_section = soup.find('h2', string=re.compile(r'Participants:'))
             if participants_section:
-                participants_text = participants_section.get_text()
-                # Extract names after "Participants: "
-                participants_match = re.search(r'Participants:\s*(.+)', participants_text)
-                if participants_match:
-                    participants = [name.strip() for name in participants_match.group(1).split(',')]
-                    self.participants.update(participants)
+                participants = self._split_participants(participants_section.get_text())
             
             # Extract messages
             message_sections = soup.find_all('section', class_='_a6-g')
@@ -134,601 +258,2478 @@ class FacebookMessageParser:
                     if not sender_element:
                         continue
                     
-                    sender_name = self.normalize_text(sender_element.get_text())
-                    
-                    # Skip if this is a system message (like group settings)
-                    if any(phrase in sender_name.lower() for phrase in ['group invite link', 'participants:']):
-                        continue
+                    sender_name = sender_element.get_text()
                     
                     # Extract message content
                     content_div = section.find('div', class_='_2ph_ _a6-p')
                     if not content_div:
                         continue
                     
-                    message_text = ""
-                    for div in content_div.find_all('div', recursive=False):
-                        text = div.get_text().strip()
-                        if text and not text.startswith('❤') and not text.startswith('👍') and not text.startswith('😮'):
-                            message_text = self.normalize_text(text)
-                            break
+                    text_blocks = [div.get_text() for div in content_div.find_all('div', recursive=False)]
                     
                     # Extract reactions
                     reactions = []
                     reaction_list = content_div.find('ul', class_='_a6-q')
                     if reaction_list:
                         for li in reaction_list.find_all('li'):
-                            reaction_text = li.get_text().strip()
-                            reactions.append(reaction_text)
+                            reactions.append(li.get_text().strip())
                     
                     # Extract timestamp
+                    timestamp_str = None
                     footer = section.find('footer')
-                    timestamp = None
                     if footer:
                         time_div = footer.find('div', class_='_a72d')
                         if time_div:
                             timestamp_str = time_div.get_text().strip()
-                            timestamp = self.parse_timestamp(timestamp_str)
                     
-                    # Create message object
-                    if message_text and timestamp:  # Only add if we have content and timestamp
-                        message = {
-                            'thread_title': thread_title,
-                            'sender_name': sender_name,
-                            'timestamp': timestamp,
-                            'content': message_text,
-                            'reactions': reactions,
-                            'file_path': str(file_path)
-                        }
-                        
+                    message = self._make_message(thread_title, sender_name, text_blocks,
+                                                 reactions, timestamp_str, file_path)
+                    if message:
                         thread_messages.append(message)
-                        self.messages.append(message)
                 
                 except Exception as e:
-                    print(f"Error parsing message section: {e}")
+                    self.metrics.record_error('section', f"{file_path}: {e}")
+                    continue
+        
+        return self._html_file_result(thread_title, participants, thread_messages)
+    
+    def _extract_html_lxml(self, file_path, data=None):
+        """Streaming backend: walk the file with lxml ``iterparse``.
+        
+        Each ``_a6-g`` section is turned into a message as soon as its closing
+        tag is seen and is then discarded, so memory stays bounded by the size
+        of a single section rather than the whole thread file.
+        """
+        thread_title = None
+        participants = None
+        thread_messages = []
+        extract_stage = self.metrics.stage('extract')
+        
+        # Reading and tree building are interleaved in iterparse, so both are
+        # charged to tree_build; extraction of each section is timed apart
+        with self.metrics.stage('tree_build'), _open_message_file(file_path, data=data) as f:
+            context = etree.iterparse(
+                f, events=('end',), tag=('h1', 'h2', 'section'),
+                html=True, encoding='utf-8', recover=True, huge_tree=True
+            )
+            for _, elem in context:
+                if elem.tag == 'h1':
+                    if thread_title is None:
+                        thread_title = self.normalize_text(_lxml_text(elem))
+                    continue
+                
+                if elem.tag == 'h2':
+                    # Same rule as soup.find('h2', string=...): text-only h2
+                    if participants is None and len(elem) == 0 and elem.text and 'Participants:' in elem.text:
+                        participants = self._split_participants(elem.text)
+                    continue
+                
+                if '_a6-g' not in (elem.get('class') or '').split():
                     continue
+                
+                try:
+                    with extract_stage:
+                        message = self._extract_lxml_section(elem, thread_title or "Unknown Thread", file_path)
+                    if message:
+                        thread_messages.append(message)
+                except Exception as e:
+                    self.metrics.record_error('section', f"{file_path}: {e}")
+                
+                # Drop the processed section and everything before it
+                elem.clear()
+                parent = elem.getparent()
+                if parent is not None:
+                    while elem.getprevious() is not None:
+                        del parent[0]
+            del context
+        
+        return self._html_file_result(thread_title or "Unknown Thread", participants or [], thread_messages)
+    
+    def _extract_lxml_section(self, section, thread_title, file_path):
+        """Extract one message from an lxml ``_a6-g`` section element."""
+        # Skip sections that are just participant info
+        if 'Participants:' in _lxml_text(section):
+            return None
+        
+        sender_element = section.find('.//h2')
+        if sender_element is None:
+            return None
+        
+        sender_name = _lxml_text(sender_element)
+        
+        content_div = section.find(".//div[@class='_2ph_ _a6-p']")
+        if content_div is None:
+            return None
+        
+        text_blocks = [_lxml_text(div) for div in content_div.findall('div')]
+        
+        reactions = []
+        for reaction_list in content_div.iter('ul'):
+            if _lxml_has_class(reaction_list, '_a6-q'):
+                reactions = [_lxml_text(li).strip() for li in reaction_list.iter('li')]
+                break
+        
+        timestamp_str = None
+        footer = section.find('.//footer')
+        if footer is not None:
+            for time_div in footer.iter('div'):
+                if _lxml_has_class(time_div, '_a72d'):
+                    timestamp_str = _lxml_text(time_div).strip()
+                    break
+        
+        return self._make_message(thread_title, sender_name, text_blocks,
+                                  reactions, timestamp_str, file_path)
+    
+    @staticmethod
+    def _split_participants(participants_text):
+        """Extract names after "Participants: "."""
+        participants_match = re.search(r'Participants:\s*(.+)', participants_text)
+        if not participants_match:
+            return []
+        return [name.strip() for name in participants_match.group(1).split(',')]
+    
+    @classmethod
+    def thread_key(cls, file_path):
+        """Key of the conversation a message file belongs to.
+        
+        This is the inbox folder id (``alice_1234567890``) for the
+        ``message_N`` files of an export, so the files of a long conversation
+        form one thread and same-titled conversations stay apart. Files not
+        named that way are each their own thread.
+        """
+        path = Path(str(file_path))
+        return path.parent.name if cls.THREAD_FILE.match(path.name) else str(path)
+    
+    @staticmethod
+    def _time_ordered(messages):
+        """A file's messages oldest first; exports list them newest first."""
+        timestamps = [msg['timestamp'] for msg in messages]
+        if all(a <= b for a, b in zip(timestamps, timestamps[1:])):
+            return messages
+        if all(a >= b for a, b in zip(timestamps, timestamps[1:])):
+            return messages[::-1]
+        return sorted(messages, key=itemgetter('timestamp'))
+    
+    @classmethod
+    def drop_copies(cls, result, held):
+        """Drop the messages of a file that earlier files of its thread already hold.
+        
+        Every monthly export repeats the whole history of a conversation, so
+        files from several exports hold copies of the same messages. Within a
+        thread a message is identified by ``MessageStore.message_key``;
+        ``held`` counts the messages kept from the thread's earlier files by
+        that key and is updated in place. A message is kept as many times as
+        the one file holding it most often has it, which leaves genuine
+        repeats (the same "ok" twice in a second) alone. Returns the result
+        with the copies removed and counted in ``'duplicates'``.
+        """
+        messages = result['messages']
+        keys = list(map(MessageStore.message_key, messages))
+        counts = Counter(keys)
+        if held.keys().isdisjoint(counts):
+            # Nothing seen before, as for the files of a single export
+            dict.update(held, counts)
+            return result
+        
+        seen = Counter()
+        kept = []
+        for message, key in zip(messages, keys):
+            seen[key] += 1
+            if seen[key] > held[key]:
+                kept.append(message)
+        held |= counts
+        
+        return {**result, 'messages': kept,
+                'duplicates': result.get('duplicates', 0) + len(messages) - len(kept)}
+    
+    def merge_thread_results(self, results):
+        """Merge the results of one conversation's files into a single result.
+        
+        Each file holds a sorted run of messages, so the runs are combined
+        with a k-way merge into one oldest-first stream instead of being
+        sorted again. Copies of messages from other exports are expected to
+        have been dropped already, see ``drop_copies``. The title is the first
+        file's that has one, and all messages are given it. Returns ``None``
+        if no file could be read.
+        """
+        results = [result for result in results if result is not None]
+        if not results:
+            return None
+        
+        titles = [result['thread_title'] for result in results]
+        thread_title = next((title for title in titles if title != "Unknown Thread"), titles[0])
+        messages = list(heapq.merge(*(self._time_ordered(result['messages']) for result in results),
+                                    key=itemgetter('timestamp')))
+        for message in messages:
+            message['thread_title'] = thread_title
+        
+        return {
+            'thread_title': thread_title,
+            'participants': list(dict.fromkeys(name for result in results for name in result['participants'])),
+            'messages': messages,
+            'timestamp_failures': sum(result.get('timestamp_failures', 0) for result in results),
+            'duplicates': sum(result.get('duplicates', 0) for result in results)
+        }
+    
+    def add_file_result(self, result, thread_key=None, signature=None):
+        """Merge the output of ``extract_html_file`` into the parser state.
+        
+        ``thread_key`` is the thread the result belongs to, by default the
+        ``thread_key`` of its messages' file. The store is append-only: when
+        the thread already has messages, only those it does not hold yet (by
+        timestamp, sender and content) are added, after its earlier rows.
+        ``signature`` identifies the files the result came from (see
+        ``ParseCache.signature``); a thread the search index holds under
+        the same signature is not indexed again.
+        """
+        if result is None:
+            return
+        
+        self.participants.update(result['participants'])
+        timestamp_failures = result.get('timestamp_failures', 0)
+        if timestamp_failures:
+            self.timestamp_failures += timestamp_failures
+            self.metrics.record_error('timestamp', f"{result['thread_title']}: {timestamp_failures} unparseable",
+                                      count=timestamp_failures)
+        
+        thread_messages = result['messages']
+        key = thread_key or (self.thread_key(thread_messages[0]['file_path']) if thread_messages else None)
+        previous = self.threads.get(key)
+        duplicates = result.get('duplicates', 0)
+        if previous is not None and thread_messages:
+            held = self.messages.keys(previous)
+            new_messages = [msg for msg in thread_messages if MessageStore.message_key(msg) not in held]
+            duplicates += len(thread_messages) - len(new_messages)
+            thread_messages = new_messages
+        if duplicates:
+            self.duplicate_messages += duplicates
+            self.metrics.counters['duplicates'] += duplicates
+        
+        start = len(self.messages)
+        self.messages.extend(thread_messages, key)
+        
+        if thread_messages:
+            # Threads refer to their rows in the message store
+            rows = range(start, len(self.messages))
+            if previous is not None:
+                if isinstance(previous, range) and previous.stop == start:
+                    rows = range(previous.start, rows.stop)
+                else:
+                    rows = [*previous, *rows]
+            self.threads[key] = rows
             
-            if thread_messages:
-                self.threads[thread_title] = thread_messages
-                print(f"Parsed {len(thread_messages)} messages from thread: {thread_title}")
+            if self.search_index is not None:
+                self.index_messages(key, signature, start, thread_messages, append=previous is not None)
+    
+    def index_messages(self, key, signature, start, thread_messages, append=False):
+        """Add a thread's messages, stored from row ``start``, to the search index."""
+        index = self.search_index
+        if index.keyed:
+            if append or not index.place_thread(key, signature, start, len(thread_messages)):
+                index.add_thread(key, signature, start,
+                                 ((msg['content'], msg['sender_name'], msg['thread_title'], key,
+                                   pd.Timestamp(msg['timestamp']).value) for msg in thread_messages),
+                                 append=append)
+        else:
+            index.add(
+                (start + i, msg['content'], msg['sender_name'], msg['thread_title'], key,
+                 pd.Timestamp(msg['timestamp']).value)
+                for i, msg in enumerate(thread_messages)
+            )
+    
+    def parse_html_file(self, file_path):
+        """Parse a single Facebook message HTML file."""
+        self.add_file_result(self.extract_html_file(file_path))
+    
+    def extract_json_file(self, file_path, data=None):
+        """Extract thread title, participants and messages from a JSON thread file.
+        
+        The ``messages`` array is decoded one element at a time, so only the
+        resulting records are kept in memory, never the whole JSON document.
+        ``data`` is as for ``extract_html_file``. Returns ``None`` if the file
+        could not be read or parsed.
+        """
+        try:
+            thread_title = None
+            participants = []
+            thread_messages = []
+            extract_stage = self.metrics.stage('extract')
+            
+            # Decoding is charged to tree_build, mapping each message to extract
+            with self.metrics.stage('tree_build'), _open_message_file(file_path, text=True, data=data) as f:
+                for key, value in _JSONStream(f).iter_thread_items():
+                    if key == 'messages':
+                        with extract_stage:
+                            message = self._make_json_message(value, file_path)
+                        if message:
+                            thread_messages.append(message)
+                    elif key in ('threadName', 'title') and thread_title is None:
+                        thread_title = self.normalize_text(value)
+                    elif key == 'thread_path' and thread_title is None:
+                        thread_title = self.normalize_text(value)
+                    elif key == 'participants':
+                        participants = [
+                            self.normalize_text(p.get('name', '') if isinstance(p, dict) else p)
+                            for p in value
+                        ]
+            
+            thread_messages = self._normalize_messages(thread_messages)
+            
+            # The title may come after the messages array (official exports)
+            thread_title = thread_title or "Unknown Thread"
+            for message in thread_messages:
+                message['thread_title'] = thread_title
             
+            return {
+                'thread_title': thread_title,
+                'participants': participants,
+                'messages': thread_messages
+            }
+        
         except Exception as e:
-            print(f"Error parsing file {file_path}: {e}")
+            self.metrics.record_error('file', f"{file_path}: {e}")
+            return None
     
-    def parse_directory(self, directory_path):
-        """Parse all HTML message files in a directory."""
-        directory_path = Path(directory_path)
+    def _make_json_message(self, msg, file_path):
+        """Map one JSON message object onto the HTML message record schema.
         
-        if not directory_path.exists():
-            raise ValueError(f"Directory does not exist: {directory_path}")
+        Accepts both the camelCase exporter format (``senderName``,
+        ``timestamp``) and Facebook's own (``sender_name``, ``timestamp_ms``).
+        """
+        if not isinstance(msg, dict):
+            return None
         
-        # Find all HTML files in messages/inbox subdirectories
-        html_files = []
+        # Skip unsent messages
+        if msg.get('isUnsent') or msg.get('is_unsent'):
+            return None
         
-        # Look for the standard Facebook export structure
-        messages_dir = directory_path / "your_facebook_activity" / "messages" / "inbox"
-        if messages_dir.exists():
-            html_files.extend(messages_dir.rglob("*.html"))
+        message_text = msg.get('text') or msg.get('content') or ""
+        if not message_text and any(msg.get(key) for key in ('media', 'photos', 'videos', 'audio_files', 'files')):
+            message_text = "[Media file]"
+        if not message_text and msg.get('sticker'):
+            message_text = "[Sticker]"
+        if not message_text and msg.get('gifs'):
+            message_text = "[GIF]"
         
-        # Also check direct inbox folder
-        inbox_dir = directory_path / "messages" / "inbox"
-        if inbox_dir.exists():
-            html_files.extend(inbox_dir.rglob("*.html"))
+        # Normalized with the rest of the file, see _normalize_messages
+        if not message_text:
+            return None
         
-        # If no standard structure, search for any HTML files
-        if not html_files:
-            html_files = list(directory_path.rglob("*message*.html"))
+        # JSON timestamps are in milliseconds
+        timestamp_ms = msg.get('timestamp') or msg.get('timestamp_ms')
+        if not timestamp_ms:
+            return None
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000)
         
-        if not html_files:
-            print(f"No HTML message files found in {directory_path}")
-            return
+        sender_name = msg.get('senderName') or msg.get('sender_name') or "Unknown Sender"
         
-        print(f"Found {len(html_files)} HTML files to process...")
+        # Match the HTML form of a reaction: emoji immediately followed by the actor
+        reactions = [
+            f"{reaction.get('reaction', '')}{reaction.get('actor', '')}".strip()
+            for reaction in msg.get('reactions') or []
+            if isinstance(reaction, dict)
+        ]
         
-        for i, file_path in enumerate(html_files):
-            if i % 10 == 0:
-                print(f"Processing file {i+1}/{len(html_files)}: {file_path.name}")
+        return {
+            'thread_title': None,
+            'sender_name': sender_name,
+            'timestamp': timestamp,
+            'content': message_text,
+            'reactions': reactions,
+            'file_path': str(file_path)
+        }
+    
+    def parse_json_file(self, file_path):
+        """Parse a single Facebook message JSON file."""
+        self.add_file_result(self.extract_json_file(file_path))
+    
+    def extract_file(self, file_path, data=None):
+        """Extract a message file, choosing the HTML or JSON reader by extension."""
+        if not isinstance(file_path, ZipMember):
+            file_path = Path(file_path)
+        if file_path.suffix.lower() == '.json':
+            return self.extract_json_file(file_path, data)
+        return self.extract_html_file(file_path, data)
+    
+    def find_message_files(self, directory_path):
+        """Find the message files to parse under an export directory.
+        
+        ``directory_path`` may also be a ZIP archive of an export, or a list
+        of directories and archives (Facebook splits large exports over
+        several ZIP parts); archive members are returned as ``ZipMember``.
+        
+        Each thread folder of a source is read in a single format: JSON when
+        the folder has ``message_*.json`` files (they are far cheaper to
+        parse), HTML otherwise. The choice is made per source, so an older
+        JSON export does not hide a newer HTML one; the messages they share
+        are dropped when merging.
+        
+        The files of a thread (see ``thread_key``) are returned together,
+        threads in the order in which they were discovered; a thread split
+        over several archives or directories, or found in several exports,
+        is treated as one.
+        """
+        sources = directory_path if isinstance(directory_path, (list, tuple)) else [directory_path]
+        threads = {}
+        for source in map(Path, sources):
+            if source.suffix.lower() == '.zip' and source.is_file():
+                candidates = ZipMember.find_message_files(source)
+            else:
+                candidates = self._find_directory_files(source)
             
-            self.parse_html_file(file_path)
+            source_threads = {}
+            for file_path in candidates:
+                source_threads.setdefault(self.thread_key(file_path), []).append(file_path)
+            for key, files in source_threads.items():
+                json_files = [f for f in files if f.suffix.lower() == '.json']
+                threads.setdefault(key, []).extend(json_files or files)
+        
+        return [file_path for files in threads.values() for file_path in files]
+    
+    @staticmethod
+    def _find_directory_files(directory_path):
+        """Candidate message files under an extracted export directory."""
+        candidates = []
+        
+        # Look for the standard Facebook export structure, then the direct inbox folder
+        for inbox_dir in (directory_path / "your_facebook_activity" / "messages" / "inbox",
+                          directory_path / "messages" / "inbox"):
+            if inbox_dir.exists():
+                candidates.extend(inbox_dir.rglob("*.html"))
+                candidates.extend(inbox_dir.rglob("message*.json"))
+        
+        # If no standard structure, search for any message files
+        if not candidates:
+            candidates.extend(directory_path.rglob("*message*.html"))
+            candidates.extend(directory_path.rglob("*message*.json"))
+        
+        return candidates
+    
+    def parse_directory(self, directory_path, workers=1, prefetch_depth=None, read_ahead=None, readers=None):
+        """Parse all HTML and JSON message files in a directory.
+        
+        ``directory_path`` may also be one or more ZIP archives of the
+        export, see ``find_message_files``. Archive members are decompressed
+        as they are parsed, without ever being written to disk.
+        
+        The files of each thread are merged into one time-ordered run of
+        messages, see ``merge_thread_results``. Several exports downloaded
+        over time can be given together: each message they have in common is
+        kept once (see ``drop_copies``), so the result is that of the newest
+        export plus whatever only older ones still hold.
+        
+        With ``workers`` greater than 1 the files, of several threads at
+        once, are parsed in a process pool and merged back in directory
+        order, so the result is identical to the serial path.
+        
+        Files are read ahead of the parser in directory order by a
+        FilePrefetcher; ``prefetch_depth``, ``read_ahead`` and ``readers``
+        override its defaults, and a ``prefetch_depth`` of 0 turns it off.
+        """
+        sources = directory_path if isinstance(directory_path, (list, tuple)) else [directory_path]
+        sources = [Path(source) for source in sources]
+        directory_path = ', '.join(map(str, sources))
+        
+        for source in sources:
+            if not source.exists():
+                raise ValueError(f"Directory does not exist: {source}")
+        
+        message_files = self.find_message_files(sources)
+        
+        if not message_files:
+            print(f"No HTML or JSON message files found in {directory_path}")
+            return
+        
+        self.parse_files(message_files, workers=workers, prefetch_depth=prefetch_depth,
+                         read_ahead=read_ahead, readers=readers, source=directory_path)
+    
+    def parse_files(self, message_files, workers=1, prefetch_depth=None, read_ahead=None, readers=None,
+                    source=None):
+        """Parse the given message files, as listed by ``find_message_files``, into the parser state.
+        
+        Options are as for ``parse_directory``. Parsing more files later adds
+        to what was parsed before; messages a thread already holds are
+        skipped (see ``add_file_result``), so files can be parsed again.
+        """
+        json_count = sum(1 for f in message_files if f.suffix.lower() == '.json')
+        print(f"Found {len(message_files)} message files to process "
+              f"({len(message_files) - json_count} HTML, {json_count} JSON)...")
+        
+        metrics = self.metrics
+        metrics.start(len(message_files), source=source, backend=self.backend)
         
-        print(f"Finished parsing. Total messages: {len(self.messages)}")
+        # Reuse cached results for files that have not changed since the last run;
+        # they are only loaded when merged, so a thread at a time is in memory
+        cached = set()
+        to_parse = message_files
+        if self.cache is not None:
+            with metrics.stage('cache'):
+                for i, file_path in enumerate(message_files):
+                    if self.cache.is_fresh(file_path):
+                        cached.add(i)
+            to_parse = [f for i, f in enumerate(message_files) if i not in cached]
+            print(f"Loaded {len(cached)} files from cache, {len(to_parse)} to parse...")
+        
+        # Overlap reading the next files with parsing the current one
+        if prefetch_depth == 0:
+            prefetched = ((f, None) for f in to_parse)
+        else:
+            prefetched = iter(FilePrefetcher(to_parse, depth=prefetch_depth, read_ahead=read_ahead,
+                                             readers=readers, metrics=metrics))
+        # Hash what was read for the cache, in parse order, so no file is read twice
+        content_hashes = deque()
+        if self.cache is not None:
+            prefetched = _hashed(prefetched, content_hashes, metrics)
+        
+        # The files of a thread are consecutive, see find_message_files
+        thread_keys = [self.thread_key(f) for f in message_files]
+        thread_results = []
+        # Messages kept from the thread's files so far, see drop_copies
+        thread_held = Counter()
+        
+        executor = None
+        if workers and workers > 1 and len(to_parse) > 1:
+            workers = min(workers, len(to_parse))
+            print(f"Parsing with {workers} worker processes...")
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.backend,))
+            parsed = _pool_results(executor, prefetched, window=workers * 2)
+        else:
+            workers = 1
+            # Stages are timed straight into self.metrics, so there is no snapshot
+            parsed = ((self.extract_file(f, data), None) for f, data in prefetched)
+        metrics.info['workers'] = workers
+        
+        try:
+            # Results are merged in directory order whichever way they were produced
+            for i, file_path in enumerate(message_files):
+                if i in cached:
+                    with metrics.stage('cache'):
+                        result = self.cache.load(file_path)
+                else:
+                    result, snapshot = next(parsed)
+                    if snapshot is not None:
+                        metrics.merge(snapshot)
+                    content_hash = content_hashes.popleft() if content_hashes else None
+                    if self.cache is not None and result is not None:
+                        with metrics.stage('cache'):
+                            self.cache.put(file_path, result, content_hash)
+                
+                metrics.file_done(file_path.stat().st_size,
+                                  len(result['messages']) if result else 0, cached=i in cached)
+                
+                last_file = i + 1 == len(message_files) or thread_keys[i + 1] != thread_keys[i]
+                if result is not None and not (last_file and not thread_results):
+                    # Several files, maybe from several exports: keep only one copy of each message
+                    with metrics.stage('merge'):
+                        result = self.drop_copies(result, thread_held)
+                thread_results.append(result)
+                
+                # Merge a thread once its last file is in
+                if last_file:
+                    signature = None
+                    if self.cache is not None:
+                        signature = self.cache.signature(message_files[i + 1 - len(thread_results):i + 1])
+                    with metrics.stage('merge'):
+                        self.add_file_result(self.merge_thread_results(thread_results), thread_key=thread_keys[i],
+                                             signature=signature)
+                    thread_results = []
+                    thread_held = Counter()
+                metrics.progress()
+        finally:
+            parsed.close()
+            prefetched.close()
+            if executor is not None:
+                executor.shutdown()
+            ZipMember.close_archives()
+            if self.cache is not None:
+                self.cache.commit()
+                metrics.info['cache_hits'] = self.cache.hits
+                metrics.info['cache_misses'] = self.cache.misses
+            metrics.finish()
+        
+        if self.search_index is not None and self.search_index.keyed:
+            # Keep the index to what was parsed, so it does not grow with every export
+            self.search_index.prune()
+        
+        print(f"Finished parsing {len(message_files)} files in {metrics.elapsed:.1f}s. "
+              f"Total messages: {len(self.messages)}")
+        if self.timestamp_failures:
+            print(f"Skipped messages with unparseable timestamps: {self.timestamp_failures}")
+        if self.duplicate_messages:
+            print(f"Skipped duplicate messages: {self.duplicate_messages:,}")
+        for category, count in metrics.errors.items():
+            if category == 'timestamp':
+                continue
+            print(f"{category.capitalize()} errors: {count} (e.g. {metrics.error_samples[category][0]})")
         print(f"Total threads: {len(self.threads)}")
         print(f"Total participants: {len(self.participants)}")
     
-    def to_dataframe(self):
-        """Convert parsed messages to a pandas DataFrame."""
+    def to_dataframe(self, start=0):
+        """Convert parsed messages to a pandas DataFrame, from row ``start`` on."""
         if not self.messages:
             return pd.DataFrame()
         
-        df = pd.DataFrame(self.messages)
-        
-        # Add derived columns
-        df['date'] = df['timestamp'].dt.date
-        df['hour'] = df['timestamp'].dt.hour
-        df['weekday'] = df['timestamp'].dt.day_name()
-        df['month'] = df['timestamp'].dt.month
-        df['year'] = df['timestamp'].dt.year
-        df['message_length'] = df['content'].str.len()
-        df['word_count'] = df['content'].str.split().str.len()
-        df['reaction_count'] = df['reactions'].str.len()
+        return MessageFrame(self.messages.to_dataframe(start))
+    
+    def export_dataset(self, path, partition_by_thread=False):
+        """Write the parsed messages to a Parquet dataset, see MessageDataset."""
+        return MessageDataset.write(self.messages.to_dataframe(), path, participants=self.participants,
+                                    partition_by_thread=partition_by_thread)
+    
+    def search(self, query, sender=None, thread=None, thread_key=None, start=None, end=None, limit=None):
+        """Full-text search over message content.
         
-        return df
+        Supports plain terms, ``"quoted phrases"`` and ``prefix*`` terms, all
+        of which must match, plus optional sender, thread (by title or by
+        ``thread_key``) and date filters. Returns row positions into
+        ``messages`` (and ``to_dataframe()``). Requires the parser to be
+        created with ``search_index=True``.
+        """
+        if self.search_index is None:
+            raise ValueError("Search index not enabled: create the parser with search_index=True")
+        return self.search_index.search(query, sender=sender, thread=thread, thread_key=thread_key,
+                                        start=start, end=end, limit=limit)
     
     def get_summary_stats(self):
         """Get summary statistics of parsed messages."""
         if not self.messages:
             return {}
         
-        timestamps = [msg['timestamp'] for msg in self.messages if msg['timestamp']]
-        
         return {
             'total_messages': len(self.messages),
             'total_participants': len(self.participants),
             'total_threads': len(self.threads),
             'participants': list(self.participants),
-            'threads': {title: len(messages) for title, messages in self.threads.items()},
-            'date_range': {
-                'start': min(timestamps),
-                'end': max(timestamps)
-            } if timestamps else None
+            # Keyed by inbox folder id, see thread_key
+            'threads': {key: len(rows) for key, rows in self.threads.items()},
+            'date_range': self.messages.date_range()
         }
 
 
-class FacebookMessageVisualizer:
-    """Create interactive visualizations for Facebook message data."""
-    
-    def __init__(self, df):
-        self.df = df
-        # Add time-based columns for the main scatter plot
-        self.df['hour_minute'] = self.df['timestamp'].dt.hour + self.df['timestamp'].dt.minute / 60.0
-        self.df['date_only'] = pd.to_datetime(self.df['timestamp'].dt.date)
-        
-        self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])  # Dark theme
-        self.setup_layout()
-        self.setup_callbacks()
-    
-    def setup_layout(self):
-        """Setup the Dash app layout similar to FBMessage."""
-        
-        # Calculate some basic stats
-        total_messages = len(self.df)
-        total_participants = self.df['sender_name'].nunique()
-        date_range = f"{self.df['date'].min()} to {self.df['date'].max()}"
-        
-        self.app.layout = html.Div([
-            # Header
-            html.Div([
-                html.H1("FBMessage Explorer", style={
-                    'color': '#ffffff', 'textAlign': 'center', 'margin': '10px',
-                    'fontFamily': 'Nunito, sans-serif'
-                }),
-                html.Button("Reset All Filters", id="reset-btn", style={
-                    'float': 'right', 'margin': '10px', 'backgroundColor': '#2c7bb6',
-                    'color': 'white', 'border': 'none', 'padding': '8px 16px', 'borderRadius': '4px'
-                })
-            ], style={'backgroundColor': '#303030', 'padding': '10px'}),
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Code points str.split() breaks words on; all of them are below U+3001
+_SPACE_TABLE = np.array([chr(i).isspace() for i in range(0x3001)])
+
+
+def _word_counts(content):
+    """Whitespace-separated word counts, the same as ``len(text.split())``.
+    
+    Works over all texts joined into one UTF-32 buffer, counting positions
+    where a word starts, so no list is built per message.
+    """
+    texts = content.tolist()
+    if not texts:
+        return np.zeros(0, dtype=np.int32)
+    chars = np.frombuffer(' '.join(texts).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    space = _SPACE_TABLE[np.minimum(chars, 0x3000)] & (chars <= 0x3000)
+    word_start = ~space
+    word_start[1:] &= space[:-1]
+    # Every text is followed by its joining space, so no segment is empty
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.add.reduceat(word_start, offsets, dtype=np.int32)
+
+
+# Column computed on first access -> (source column, function of that column)
+DERIVED_COLUMNS = {
+    # Messages that were not parsed into threads (see MessageStore) are grouped by title
+    'thread_key': ('thread_title', lambda titles: titles),
+    'date': ('timestamp', lambda ts: ts.dt.normalize()),
+    'hour': ('timestamp', lambda ts: ts.dt.hour.astype(np.int8)),
+    'weekday': ('timestamp', lambda ts: pd.Categorical.from_codes(
+        ts.dt.weekday.to_numpy(np.int8), categories=WEEKDAYS, ordered=True)),
+    'month': ('timestamp', lambda ts: ts.dt.month.astype(np.int8)),
+    'year': ('timestamp', lambda ts: ts.dt.year.astype(np.int16)),
+    'message_length': ('content', lambda content: content.str.len().astype(np.int32)),
+    'word_count': ('content', _word_counts),
+    'reaction_count': ('reactions', lambda reactions: np.fromiter(
+        map(len, reactions), dtype=np.int16, count=len(reactions))),
+}
+
+
+class MessageFrame(pd.DataFrame):
+    """DataFrame of messages whose calendar and length columns are derived lazily.
+    
+    The columns in DERIVED_COLUMNS are computed the first time they are read
+    and then kept, as small integer, categorical and datetime64 columns.
+    Reading means ``df[name]``, ``df.name``, ``name in df`` or naming them
+    in ``groupby`` or ``sort_values``. Until then they are not in
+    ``columns``, so other lookups such as ``df.loc[:, name]`` need a
+    ``derive()`` first, which adds them up front. Columns whose source
+    column is missing (after a projected dataset load) stay missing.
+    """
+    
+    @property
+    def _constructor(self):
+        # Slices and copies keep deriving their columns
+        return MessageFrame
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            self._derive_missing((key,))
+        elif isinstance(key, (list, tuple, pd.Index)):
+            self._derive_missing(key)
+        return super().__getitem__(key)
+    
+    def __getattr__(self, name):
+        if name in DERIVED_COLUMNS:
+            self._derive_missing((name,))
+        return super().__getattr__(name)
+    
+    def __contains__(self, key):
+        # pandas also asks this before grouping by a column name
+        if isinstance(key, str):
+            self._derive_missing((key,))
+        return super().__contains__(key)
+    
+    def groupby(self, by=None, *args, **kwargs):
+        self._derive_missing(by if isinstance(by, list) else (by,))
+        return super().groupby(by, *args, **kwargs)
+    
+    def sort_values(self, by, *args, **kwargs):
+        self._derive_missing(by if isinstance(by, list) else (by,))
+        return super().sort_values(by, *args, **kwargs)
+    
+    def derive(self, *names):
+        """Compute the given derived columns now, or all of them; return self."""
+        self._derive_missing(names or DERIVED_COLUMNS)
+        return self
+    
+    def _derive_missing(self, names):
+        columns = self.columns
+        for name in names:
+            if isinstance(name, str) and name in DERIVED_COLUMNS and name not in columns:
+                source, compute = DERIVED_COLUMNS[name]
+                if source in columns:
+                    self[name] = compute(super().__getitem__(source))
+
+
+def _lxml_text(elem):
+    """Equivalent of BeautifulSoup's ``get_text()`` for an lxml element."""
+    return ''.join(elem.itertext())
+
+
+def _lxml_has_class(elem, class_name):
+    """Check whether an lxml element carries ``class_name`` among its classes."""
+    return class_name in (elem.get('class') or '').split()
+
+
+class TimestampParser:
+    """Batch parser for the footer timestamps of Facebook HTML exports.
+    
+    The format is detected once per batch from its first string and the whole
+    batch is then parsed in a single vectorized pass, with per-string fallback
+    to the other known formats. Results are memoized, since many messages share
+    the same timestamp string.
+    """
+    
+    FORMATS = [
+        "%b %d, %Y %I:%M:%S %p",   # Oct 25, 2022 10:03:52 am
+        "%B %d, %Y %I:%M:%S %p",   # October 25, 2022 10:03:52 am
+        "%m/%d/%Y %I:%M:%S %p",    # 10/25/2022 10:03:52 am
+        "%Y-%m-%d %H:%M:%S",       # 2022-10-25 10:03:52
+        "%b %d, %Y, %I:%M:%S %p",  # Oct 25, 2022, 10:03:52 AM
+        "%b %d, %Y %I:%M %p",      # Oct 25, 2022 10:03 am
+        "%b %d, %Y, %I:%M %p",     # Oct 25, 2022, 10:03 AM
+        "%d %b %Y, %H:%M:%S",      # 25 Oct 2022, 10:03:52
+        "%d %b %Y %H:%M:%S",       # 25 Oct 2022 10:03:52
+        "%d %B %Y, %H:%M:%S",      # 25 October 2022, 10:03:52
+        "%d %B %Y %H:%M:%S",       # 25 October 2022 10:03:52
+        "%d %b %Y, %H:%M",         # 25 Oct 2022, 10:03
+        "%d/%m/%Y, %H:%M:%S",      # 25/10/2022, 10:03:52
+        "%Y-%m-%dT%H:%M:%S",       # 2022-10-25T10:03:52
+    ]
+    
+    # Timezone suffixes such as "GMT+01:00", "UTC", "+0100" or "PDT"; the wall
+    # clock time is kept as written, like the original parser did
+    _TZ_SUFFIX = re.compile(r'\s*(?:(?:UTC|GMT)(?:[+-]\d{1,2}(?::?\d{2})?)?|[+-]\d{2}:?\d{2}|[A-Z]{3,4})$')
+    
+    # Below this many new strings, strptime is cheaper than a pandas round trip
+    VECTORIZE_THRESHOLD = 64
+    
+    def __init__(self, cache_size=100_000):
+        self.cache_size = cache_size
+        self.cache = {}
+        self.format_counts = Counter()
+        self.parsed = 0
+        self.failed = 0
+    
+    def clean(self, timestamp_str):
+        """Normalize whitespace and drop any timezone suffix."""
+        timestamp_str = timestamp_str.replace('\u202f', ' ').replace('\xa0', ' ').strip()
+        return self._TZ_SUFFIX.sub('', timestamp_str)
+    
+    def detect_format(self, timestamp_str):
+        """Return the first known format that parses ``timestamp_str``, if any."""
+        for fmt in self.FORMATS:
+            try:
+                datetime.strptime(timestamp_str, fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+    
+    def parse(self, timestamp_str):
+        """Parse a single timestamp string, returning ``None`` on failure."""
+        return self.parse_many([timestamp_str])[0]
+    
+    def parse_many(self, timestamp_strs):
+        """Parse a batch of timestamp strings, returning datetimes or ``None``."""
+        cleaned = [self.clean(ts) if ts else '' for ts in timestamp_strs]
+        todo = [ts for ts in dict.fromkeys(cleaned) if ts and ts not in self.cache]
+        
+        if todo:
+            if len(self.cache) + len(todo) > self.cache_size:
+                self.cache.clear()
             
-            # Main layout container
-            html.Div([
-                # Left side - Time density chart
-                html.Div([
-                    dcc.Graph(
-                        id='time-density',
-                        style={'height': '70vh', 'width': '100%'},
-                        config={'displayModeBar': False}
-                    )
-                ], style={
-                    'width': '11%', 'display': 'inline-block', 'verticalAlign': 'top',
-                    'backgroundColor': '#303030'
-                }),
-                
-                # Center - Main scatter plot
-                html.Div([
-                    dcc.Graph(
-                        id='main-scatter',
-                        style={'height': '70vh', 'width': '100%'},
-                        config={'displayModeBar': False}
-                    )
-                ], style={
-                    'width': '58%', 'display': 'inline-block', 'verticalAlign': 'top',
-                    'backgroundColor': '#303030'
-                }),
-                
-                # Right side - Filter histograms
-                html.Div([
-                    html.Div(id='filter-histograms')
-                ], style={
-                    'width': '30%', 'display': 'inline-block', 'verticalAlign': 'top',
-                    'backgroundColor': '#303030', 'height': '70vh', 'overflowY': 'scroll'
-                }),
-            ], style={'margin': '0px'}),
+            fmt = self.detect_format(todo[0])
+            if fmt and len(todo) >= self.VECTORIZE_THRESHOLD:
+                parsed = pd.to_datetime(pd.Series(todo), format=fmt, errors='coerce')
+                for ts, value in zip(todo, parsed.dt.to_pydatetime()):
+                    if not pd.isna(value):
+                        self.cache[ts] = value
+                        self.format_counts[fmt] += 1
             
-            # Bottom row
-            html.Div([
-                # Date density chart
-                html.Div([
-                    dcc.Graph(
-                        id='date-density',
-                        style={'height': '20vh', 'width': '100%'},
-                        config={'displayModeBar': False}
-                    )
-                ], style={
-                    'width': '69%', 'display': 'inline-block', 'verticalAlign': 'top',
-                    'marginLeft': '11%', 'backgroundColor': '#303030'
-                }),
+            # Strings the detected format did not cover try every format
+            for ts in todo:
+                if ts in self.cache:
+                    continue
                 
-                # Message displayer
-                html.Div([
-                    html.H4("Message Details", style={'color': '#ffffff', 'margin': '10px'}),
-                    html.Div(id='message-details', style={
-                        'color': '#ffffff', 'padding': '10px', 'fontSize': '12px',
-                        'fontFamily': 'monospace'
-                    })
-                ], style={
-                    'width': '30%', 'display': 'inline-block', 'verticalAlign': 'top',
-                    'backgroundColor': '#353535', 'height': '20vh', 'overflowY': 'scroll'
-                }),
-            ], style={'margin': '0px'}),
-            
-            # Hidden divs to store filter states
-            html.Div(id='clicked-filters', style={'display': 'none'}),
-            
-        ], style={'backgroundColor': '#303030', 'margin': '0px', 'height': '100vh'})
+                value = None
+                for candidate in ([fmt] if fmt else []) + self.FORMATS:
+                    try:
+                        value = datetime.strptime(ts, candidate)
+                    except ValueError:
+                        continue
+                    self.format_counts[candidate] += 1
+                    break
+                self.cache[ts] = value
+        
+        results = [self.cache.get(ts) if ts else None for ts in cleaned]
+        failed = results.count(None)
+        self.failed += failed
+        self.parsed += len(results) - failed
+        return results
+
+
+class TextNormalizer:
+    """Normalization of the sender names, thread titles and message text of an export.
+    
+    Gives the same result as NFKD normalization, HTML unescaping and
+    stripping, plus repair of mojibake: the UTF-8 bytes read as latin-1 that
+    Facebook writes into its JSON exports ("Ã©" for "é"). Pure-ASCII text
+    skips all of it but the strip, and short strings such as names and
+    titles, which repeat throughout an export, are memoized.
+    """
     
-    def setup_callbacks(self):
-        """Setup Dash callbacks for interactivity."""
+    # Strings up to this long are memoized
+    MEMO_MAX_LENGTH = 64
+    
+    # A UTF-8 lead byte followed by a continuation byte, as latin-1 characters
+    _MOJIBAKE = re.compile('[\xc2-\xf4][\x80-\xbf]')
+    _NOT_LATIN1 = re.compile('[^\x00-\xff]')
+    # Joins a batch for one decode; UTF-8 only decodes to it from a NUL byte
+    _SEPARATOR = '\x00'
+    
+    def __init__(self, cache_size=50_000):
+        self.cache_size = cache_size
+        self.cache = {}
+        self.repaired = 0
+    
+    def normalize(self, text):
+        """Normalize a single name or title (or UTF-8 bytes), memoized."""
+        return self.normalize_many([text], memo=True)[0]
+    
+    def normalize_many(self, texts, memo=False):
+        """Normalize a batch of strings, such as all message bodies of one file.
         
-        # Create filter histograms
-        @self.app.callback(
-            Output('filter-histograms', 'children'),
-            Input('reset-btn', 'n_clicks')
-        )
-        def create_filter_histograms(reset_clicks):
-            histograms = []
-            
-            # Received/Sent histogram
-            sent_counts = self.df.groupby(self.df['sender_name'] == self.get_main_user()).size()
-            sent_data = [
-                {'category': 'Received', 'count': sent_counts.get(False, 0)},
-                {'category': 'Sent', 'count': sent_counts.get(True, 0)}
-            ]
-            
-            histograms.append(html.Div([
-                html.H6("Received / Sent", style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
-                dcc.Graph(
-                    id='sent-received-hist',
-                    figure=self.create_histogram_figure(sent_data, 'category', 'count'),
-                    style={'height': '120px'},
-                    config={'displayModeBar': False}
-                )
-            ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'}))
-            
-            # Weekday histogram
-            weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            weekday_counts = self.df['weekday'].value_counts().reindex(weekday_order, fill_value=0)
-            weekday_data = [{'category': day[:3], 'count': count} for day, count in weekday_counts.items()]
-            
-            histograms.append(html.Div([
-                html.H6("Week Day", style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
-                dcc.Graph(
-                    id='weekday-hist',
-                    figure=self.create_histogram_figure(weekday_data, 'category', 'count'),
-                    style={'height': '120px'},
-                    config={'displayModeBar': False}
-                )
-            ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'}))
-            
-            # Top threads histogram
-            top_threads = self.df['thread_title'].value_counts().head(10)
-            thread_data = [{'category': title[:15] + "..." if len(title) > 15 else title, 'count': count} 
-                          for title, count in top_threads.items()]
-            
-            histograms.append(html.Div([
-                html.H6("Top 10 Threads", style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
-                dcc.Graph(
-                    id='threads-hist',
-                    figure=self.create_histogram_figure(thread_data, 'category', 'count'),
-                    style={'height': '180px'},
-                    config={'displayModeBar': False}
-                )
-            ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'}))
-            
-            # Top senders histogram
-            top_senders = self.df['sender_name'].value_counts().head(10)
-            sender_data = [{'category': name[:15] + "..." if len(name) > 15 else name, 'count': count} 
-                          for name, count in top_senders.items()]
-            
-            histograms.append(html.Div([
-                html.H6("Top 10 Senders", style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
-                dcc.Graph(
-                    id='senders-hist',
-                    figure=self.create_histogram_figure(sender_data, 'category', 'count'),
-                    style={'height': '180px'},
-                    config={'displayModeBar': False}
-                )
-            ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'}))
-            
-            # Message length histogram
-            length_bins = [0, 1, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, float('inf')]
-            length_labels = ['0-1', '1-5', '5-10', '10-20', '20-50', '50-100', '100-200', '200-500', '500-1k', '1k-5k', '5k+']
-            self.df['length_bin'] = pd.cut(self.df['message_length'], bins=length_bins, 
-                                          labels=length_labels, right=False)
-            length_counts = self.df['length_bin'].value_counts().sort_index()
-            length_data = [{'category': str(cat), 'count': count} for cat, count in length_counts.items()]
-            
-            histograms.append(html.Div([
-                html.H6("Message Length", style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
-                dcc.Graph(
-                    id='length-hist',
-                    figure=self.create_histogram_figure(length_data, 'category', 'count'),
-                    style={'height': '180px'},
-                    config={'displayModeBar': False}
-                )
-            ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'}))
-            
-            return histograms
+        With ``memo`` the short strings are looked up in and added to the
+        memo; use it for names and titles, not for message bodies, which
+        rarely repeat and would only crowd the names out.
+        """
+        texts = [text if text.__class__ is str else self._as_text(text) for text in texts]
+        if not memo:
+            return self._normalize_batch(texts)
         
-        # Main scatter plot
-        @self.app.callback(
-            Output('main-scatter', 'figure'),
-            [Input('reset-btn', 'n_clicks')]
-        )
-        def update_main_scatter(reset_clicks):
-            return self.create_main_scatter_plot()
+        cache = self.cache
+        results = [cache.get(text) for text in texts]
+        todo = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if todo:
+            if len(cache) + len(todo) > self.cache_size:
+                cache.clear()
+            normalized = dict(zip(todo, self._normalize_batch(todo)))
+            cache.update((text, value) for text, value in normalized.items() if len(text) <= self.MEMO_MAX_LENGTH)
+            results = [normalized[text] if result is None else result for text, result in zip(texts, results)]
+        return results
+    
+    def _normalize_batch(self, texts):
+        unescape = py_html.unescape
+        # NFKD leaves ASCII unchanged
+        results = [(unescape(text) if '&' in text else text).strip() if text.isascii() else None
+                   for text in texts]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            repaired = self.repair_mojibake([texts[i] for i in pending])
+            for i, text in zip(pending, repaired):
+                results[i] = unescape(unicodedata.normalize('NFKD', text)).strip()
+        return results
+    
+    @staticmethod
+    def _as_text(text):
+        if isinstance(text, bytes):
+            return text.decode('utf-8', errors='ignore')
+        return str(text) if text else ""
+    
+    def repair_mojibake(self, texts):
+        """Undo UTF-8 read as latin-1 in each string where that is what happened.
         
-        # Time density chart
-        @self.app.callback(
-            Output('time-density', 'figure'),
-            [Input('reset-btn', 'n_clicks')]
-        )
-        def update_time_density(reset_clicks):
-            return self.create_time_density_plot()
+        A string is repaired when all its characters are latin-1, it has a
+        UTF-8 lead byte followed by a continuation byte, and its bytes decode
+        as UTF-8, which ordinary latin-1 text ("café") practically never
+        does. The candidates of a batch are decoded in one go, falling back
+        to one at a time if any of them does not decode.
+        """
+        texts = list(texts)
+        candidates = [i for i, text in enumerate(texts)
+                      if self._MOJIBAKE.search(text) and not self._NOT_LATIN1.search(text)]
+        if not candidates:
+            return texts
         
-        # Date density chart
-        @self.app.callback(
-            Output('date-density', 'figure'),
-            [Input('reset-btn', 'n_clicks')]
-        )
-        def update_date_density(reset_clicks):
-            return self.create_date_density_plot()
+        try:
+            parts = self._SEPARATOR.join(texts[i] for i in candidates).encode('latin-1').decode('utf-8')
+            parts = parts.split(self._SEPARATOR)
+        except UnicodeDecodeError:
+            parts = None
+        if parts is None or len(parts) != len(candidates):
+            # A candidate that is not mojibake after all, or that contains the separator
+            parts = [self._repair_one(texts[i]) for i in candidates]
         
-        # Message details on hover
-        @self.app.callback(
-            Output('message-details', 'children'),
-            [Input('main-scatter', 'hoverData')]
-        )
-        def display_hover_data(hoverData):
-            if hoverData is None:
-                return "Hover over a message dot to see details"
-            
-            point = hoverData['points'][0]
-            # Find the message closest to the hover point
-            hover_date = point['x']
-            hover_time = point['y']
-            
-            # Convert back to find closest message
-            closest_msg = self.df.iloc[(self.df['date_only'] - pd.to_datetime(hover_date)).abs().argsort()[:1]]
-            if len(closest_msg) > 0:
-                msg = closest_msg.iloc[0]
-                return html.Div([
-                    html.P(f"Thread: {msg['thread_title'][:50]}...", style={'margin': '2px'}),
-                    html.P(f"Sender: {msg['sender_name']}", style={'margin': '2px'}),
-                    html.P(f"Time: {msg['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}", style={'margin': '2px'}),
-                    html.P(f"Message: {msg['content'][:100]}...", style={'margin': '2px', 'wordWrap': 'break-word'})
-                ])
-            
-            return "No message found"
-    
-    def get_main_user(self):
-        """Identify the main user (appears in most threads)."""
-        # Count how many threads each user appears in
-        user_thread_counts = self.df.groupby('sender_name')['thread_title'].nunique().sort_values(ascending=False)
-        return user_thread_counts.index[0] if len(user_thread_counts) > 0 else None
-    
-    def create_histogram_figure(self, data, x_col, y_col):
-        """Create a horizontal histogram figure with FBMessage styling."""
-        if not data:
-            return go.Figure()
-        
-        fig = go.Figure(data=[
-            go.Bar(
-                y=[d[x_col] for d in data],
-                x=[d[y_col] for d in data],
-                orientation='h',
-                marker=dict(color='#2c7bb6'),
-                text=[d[y_col] for d in data],
-                textposition='outside',
-                textfont=dict(color='#A0A0A0', size=10),
-                hovertemplate='<b>%{y}</b><br>Count: %{x}<extra></extra>'
+        for i, part in zip(candidates, parts):
+            if part != texts[i]:
+                texts[i] = part
+                self.repaired += 1
+        return texts
+    
+    @staticmethod
+    def _repair_one(text):
+        try:
+            return text.encode('latin-1').decode('utf-8')
+        except UnicodeDecodeError:
+            return text
+
+
+class MessageStore:
+    """Columnar, append-only store for parsed messages.
+    
+    Thread titles and keys, sender names and file paths are interned into
+    integer codes, timestamps are kept as int64 nanoseconds since the epoch
+    and reactions are flattened into one list with per-message offsets.
+    Iterating or indexing still yields the familiar per-message dicts; the
+    thread key (see ``FacebookMessageParser.thread_key``) is only a column
+    of ``to_dataframe()``.
+    """
+    
+    _EPOCH = datetime(1970, 1, 1)
+    _ONE_MICROSECOND = timedelta(microseconds=1)
+    _ONE_SECOND = timedelta(seconds=1)
+    
+    def __init__(self):
+        self.thread_titles = _StringInterner()
+        self.thread_keys = _StringInterner()
+        self.sender_names = _StringInterner()
+        self.file_paths = _StringInterner()
+        self.thread_codes = array('i')
+        self.key_codes = array('i')
+        self.sender_codes = array('i')
+        self.file_codes = array('i')
+        self.timestamps = array('q')
+        self.contents = []
+        self.reactions = []
+        self.reaction_offsets = array('q', [0])
+    
+    def __len__(self):
+        return len(self.timestamps)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._message(i)
+    
+    def __getitem__(self, i):
+        """The message dict at position ``i``, or a list of them for a slice, as for a list."""
+        if isinstance(i, slice):
+            return [self._message(j) for j in range(*i.indices(len(self)))]
+        i = index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("message index out of range")
+        return self._message(i)
+    
+    def _message(self, i):
+        start, end = self.reaction_offsets[i], self.reaction_offsets[i + 1]
+        return {
+            'thread_title': self.thread_titles.values[self.thread_codes[i]],
+            'sender_name': self.sender_names.values[self.sender_codes[i]],
+            'timestamp': self._EPOCH + self.timestamps[i] // 1000 * self._ONE_MICROSECOND,
+            'content': self.contents[i],
+            'reactions': self.reactions[start:end],
+            'file_path': self.file_paths.values[self.file_codes[i]]
+        }
+    
+    def append(self, message, thread_key=None):
+        """Append one message record of thread ``thread_key``, by default its title."""
+        self.thread_codes.append(self.thread_titles.code(message['thread_title']))
+        self.key_codes.append(self.thread_keys.code(message['thread_title'] if thread_key is None else thread_key))
+        self.sender_codes.append(self.sender_names.code(message['sender_name']))
+        self.file_codes.append(self.file_paths.code(message['file_path']))
+        self.timestamps.append((message['timestamp'] - self._EPOCH) // self._ONE_MICROSECOND * 1000)
+        self.contents.append(message['content'])
+        self.reactions.extend(message['reactions'])
+        self.reaction_offsets.append(len(self.reactions))
+    
+    def extend(self, messages, thread_key=None):
+        """Append several message records, as for ``append``."""
+        for message in messages:
+            self.append(message, thread_key)
+    
+    @classmethod
+    def message_key(cls, message):
+        """Identity of a message record: (whole seconds since the epoch, sender, content).
+        
+        Seconds, because HTML exports only have that resolution, so the same
+        message from an HTML and a JSON export has the same key.
+        """
+        return ((message['timestamp'] - cls._EPOCH) // cls._ONE_SECOND,
+                message['sender_name'], message['content'])
+    
+    def keys(self, rows):
+        """The ``message_key`` of every message at ``rows``, as a set."""
+        senders = self.sender_names.values
+        return {(self.timestamps[i] // 1_000_000_000, senders[self.sender_codes[i]], self.contents[i])
+                for i in rows}
+    
+    def date_range(self):
+        """Return the first and last timestamp as datetimes, or ``None`` if empty."""
+        if not self.timestamps:
+            return None
+        return {
+            'start': pd.Timestamp(min(self.timestamps)).to_pydatetime(),
+            'end': pd.Timestamp(max(self.timestamps)).to_pydatetime()
+        }
+    
+    def to_dataframe(self, start=0):
+        """Build a DataFrame straight from the columns, from row ``start`` on.
+        
+        Interned strings become ``category`` columns over the existing codes,
+        and timestamps are a zero-copy view of the int64 buffer.
+        """
+        offsets = np.frombuffer(self.reaction_offsets, dtype=np.int64)[start:]
+        # Most messages have no reactions, so they share one empty tuple
+        reactions = [
+            tuple(self.reactions[first:end]) if end > first else ()
+            for first, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+        
+        return pd.DataFrame({
+            'thread_title': self.thread_titles.categorical(self.thread_codes, start),
+            'thread_key': self.thread_keys.categorical(self.key_codes, start),
+            'sender_name': self.sender_names.categorical(self.sender_codes, start),
+            'timestamp': np.frombuffer(self.timestamps, dtype=np.int64)[start:].view('datetime64[ns]'),
+            'content': self.contents[start:] if start else self.contents,
+            'reactions': reactions,
+            'file_path': self.file_paths.categorical(self.file_codes, start)
+        })
+
+
+class _StringInterner:
+    """Map repeated strings to small integer codes."""
+    
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+    
+    def code(self, value):
+        """Return the code for ``value``, assigning a new one if needed."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def categorical(self, codes, start=0):
+        """Wrap an array of codes, from ``start`` on, as a pandas Categorical without copying strings."""
+        return pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32)[start:], categories=self.values)
+
+
+class MessageSearchIndex:
+    """Full-text index over message content, backed by an SQLite FTS5 table.
+    
+    Each row is keyed by its message row position. Sender, thread title and
+    key and timestamp are stored alongside the text (unindexed) for filtering.
+    
+    A ``keyed`` index instead gives every thread's messages their own ids,
+    which a ``ranges`` table maps to the rows they are at now. It is kept
+    across runs (see ``FacebookMessageParser``), so a thread whose files
+    did not change is placed at its new rows without indexing it again.
+    """
+    
+    # Bump when the columns change; a keyed index of another version is rebuilt
+    VERSION = 1
+    
+    # A quoted phrase, or a bare word optionally ending in * for prefix search
+    _QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+    
+    def __init__(self, path=':memory:', read_only=False, keyed=False):
+        self.path = str(path)
+        self.read_only = read_only
+        # Shared with the dashboard's request threads, hence the lock
+        self.lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._keyed = None
+        if keyed and self.conn.execute('PRAGMA user_version').fetchone()[0] != self.VERSION:
+            # Kept from an older version: start over
+            for table in ('messages', 'threads', 'ranges'):
+                self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+            self.conn.execute(f'PRAGMA user_version = {self.VERSION}')
+        if not read_only:
+            self.conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5('
+                'content, sender UNINDEXED, thread UNINDEXED, thread_key UNINDEXED, ts UNINDEXED, '
+                "tokenize='unicode61 remove_diacritics 2')"
             )
-        ])
+        if keyed:
+            # Only a cache, so commits need not wait for the disk
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS threads (key TEXT PRIMARY KEY, signature TEXT)')
+            # Ids first_id.. of a thread's messages, and the row the first is at (NULL if not loaded)
+            self.conn.execute('CREATE TABLE IF NOT EXISTS ranges ('
+                              'first_id INTEGER PRIMARY KEY, count INTEGER, key TEXT, row INTEGER)')
+            # Rows are those of the parser using the index, which starts empty
+            self.conn.execute('UPDATE ranges SET row = NULL')
+            self.conn.commit()
+    
+    @property
+    def conn(self):
+        """The SQLite connection; a read-only index opens its own in every process.
         
-        fig.update_layout(
-            plot_bgcolor='#353535',
-            paper_bgcolor='#353535',
-            font=dict(color='#A0A0A0', size=10),
-            margin=dict(l=80, r=30, t=10, b=30),
-            xaxis=dict(
-                showgrid=False,
-                showline=False,
-                showticklabels=False,
-                color='#A0A0A0'
-            ),
-            yaxis=dict(
-                showgrid=False,
-                showline=False,
-                color='#A0A0A0',
-                tickfont=dict(size=9)
-            ),
-            showlegend=False,
-            height=None
-        )
+        A connection must not be used across a fork, and the gunicorn workers
+        of wsgi.py are forked after the index is loaded.
+        """
+        if self._conn is None or (self.read_only and self._pid != os.getpid()):
+            if self.read_only:
+                self._conn = sqlite3.connect(Path(self.path).resolve().as_uri() + '?mode=ro', uri=True,
+                                             check_same_thread=False)
+            else:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+    
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build an index from a message DataFrame, keyed by row position."""
+        index = cls()
+        index.add(zip(range(len(df)), df['content'],
+                      df['sender_name'].astype(str), df['thread_title'].astype(str), df['thread_key'].astype(str),
+                      df['timestamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64).tolist()))
+        return index
+    
+    @property
+    def keyed(self):
+        """Whether rows are mapped through the ``ranges`` table, see the class docstring."""
+        if self._keyed is None:
+            with self.lock:
+                self._keyed = self.conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ranges'"
+                ).fetchone() is not None
+        return self._keyed
+    
+    def add(self, rows):
+        """Index ``(row, content, sender, thread, thread_key, timestamp_ns)`` tuples."""
+        with self.lock:
+            self.conn.executemany(
+                'INSERT INTO messages (rowid, content, sender, thread, thread_key, ts) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self.conn.commit()
+    
+    def place_thread(self, key, signature, row, count):
+        """Map thread ``key``'s messages to the rows from ``row`` if it is indexed as ``signature``.
         
-        return fig
-    
-    def create_main_scatter_plot(self):
-        """Create the main scatter plot showing messages over time."""
-        fig = go.Figure()
-        
-        # Sample data if too many points (for performance)
-        df_plot = self.df.sample(min(10000, len(self.df))) if len(self.df) > 10000 else self.df
-        
-        fig.add_trace(go.Scatter(
-            x=df_plot['date_only'],
-            y=df_plot['hour_minute'],
-            mode='markers',
-            marker=dict(
-                size=3,
-                color='#2c7bb6',
-                opacity=0.6
-            ),
-            text=df_plot['content'].str[:50] + "...",
-            hovertemplate='<b>%{text}</b><br>Date: %{x}<br>Time: %{y:.1f}h<extra></extra>',
-            showlegend=False
-        ))
+        ``signature`` identifies the files the thread was read from, see
+        ``ParseCache.signature``. Returns whether the thread was placed;
+        if not, its messages have to be indexed with ``add_thread``.
+        """
+        if signature is None:
+            return False
+        with self.lock:
+            indexed = self.conn.execute('SELECT signature FROM threads WHERE key = ?', (key,)).fetchone()
+            ranges = self.conn.execute('SELECT first_id, count, row FROM ranges WHERE key = ?', (key,)).fetchall()
+            if indexed is None or indexed[0] != signature or len(ranges) != 1 or ranges[0][1:] != (count, None):
+                return False
+            self.conn.execute('UPDATE ranges SET row = ? WHERE first_id = ?', (row, ranges[0][0]))
+            self.conn.commit()
+        return True
+    
+    def add_thread(self, key, signature, row, rows, append=False):
+        """Index ``(content, sender, thread, thread_key, timestamp_ns)`` tuples of thread ``key`` from ``row``.
         
-        fig.update_layout(
-            plot_bgcolor='#303030',
-            paper_bgcolor='#303030',
-            font=dict(color='#A0A0A0'),
-            margin=dict(l=40, r=20, t=10, b=40),
-            xaxis=dict(
-                title="",
-                showgrid=True,
-                gridcolor='#404040',
-                color='#A0A0A0',
-                showline=True,
-                linecolor='#A0A0A0'
-            ),
-            yaxis=dict(
-                title="",
-                showgrid=True,
-                gridcolor='#404040',
-                color='#A0A0A0',
-                showline=True,
-                linecolor='#A0A0A0',
-                range=[24, 0],  # Reverse so midnight is at top
-                tickvals=list(range(0, 25, 4)),
-                ticktext=['12AM', '4AM', '8AM', '12PM', '4PM', '8PM', '12AM']
-            ),
-            showlegend=False,
-            height=None
-        )
+        The thread's earlier messages are dropped from the index, unless
+        ``append`` is set for messages added to a thread already loaded.
+        Those leave the thread without a signature, so it is indexed
+        again as a whole when next loaded.
+        """
+        with self.lock:
+            if not append:
+                for first_id, count in self.conn.execute(
+                        'SELECT first_id, count FROM ranges WHERE key = ?', (key,)).fetchall():
+                    self.conn.execute('DELETE FROM messages WHERE rowid >= ? AND rowid < ?',
+                                      (first_id, first_id + count))
+                self.conn.execute('DELETE FROM ranges WHERE key = ?', (key,))
+            first_id = self.conn.execute('SELECT COALESCE(MAX(first_id + count), 0) FROM ranges').fetchone()[0]
+            cursor = self.conn.executemany(
+                'INSERT INTO messages (rowid, content, sender, thread, thread_key, ts) VALUES (?, ?, ?, ?, ?, ?)',
+                ((first_id + i, *fields) for i, fields in enumerate(rows))
+            )
+            self.conn.execute('INSERT INTO ranges VALUES (?, ?, ?, ?)', (first_id, cursor.rowcount, key, row))
+            self.conn.execute('INSERT OR REPLACE INTO threads VALUES (?, ?)', (key, None if append else signature))
+            self.conn.commit()
+    
+    def prune(self):
+        """Drop the threads of a keyed index that the current rows do not include.
         
-        return fig
+        Those are threads not loaded since the index was opened, such as
+        those of other exports parsed with the same cache.
+        """
+        with self.lock:
+            for first_id, count in self.conn.execute(
+                    'SELECT first_id, count FROM ranges WHERE row IS NULL').fetchall():
+                self.conn.execute('DELETE FROM messages WHERE rowid >= ? AND rowid < ?', (first_id, first_id + count))
+            self.conn.execute('DELETE FROM ranges WHERE row IS NULL')
+            self.conn.execute('DELETE FROM threads WHERE key NOT IN (SELECT key FROM ranges)')
+            self.conn.commit()
     
-    def create_time_density_plot(self):
-        """Create time density plot (vertical, showing message count by hour)."""
-        hourly_counts = self.df.groupby('hour').size().reset_index(name='count')
+    @classmethod
+    def to_match_expression(cls, query):
+        """Translate a user query into a safe FTS5 MATCH expression.
         
-        fig = go.Figure()
+        Every token is quoted so punctuation cannot be read as FTS5 syntax;
+        a trailing ``*`` on a bare word is kept as a prefix query.
+        """
+        terms = []
+        for phrase, word in cls._QUERY_TOKEN.findall(query or ''):
+            text = phrase if phrase else word
+            prefix = not phrase and text.endswith('*')
+            text = text.rstrip('*') if prefix else text
+            if not text.strip():
+                continue
+            term = '"' + text.replace('"', '""') + '"'
+            terms.append(term + '*' if prefix else term)
+        return ' '.join(terms)
+    
+    def search(self, query, sender=None, thread=None, thread_key=None, start=None, end=None, limit=None):
+        """Return the sorted row positions of messages matching ``query``."""
+        expression = self.to_match_expression(query)
+        if not expression:
+            return np.array([], dtype=np.int64)
         
-        fig.add_trace(go.Scatter(
-            x=hourly_counts['count'],
-            y=hourly_counts['hour'],
-            fill='tozerox',
-            fillcolor='rgba(44, 123, 182, 0.7)',
-            line=dict(color='#2c7bb6', width=1),
-            mode='lines',
-            showlegend=False
-        ))
+        sql = 'SELECT rowid FROM messages WHERE messages MATCH ?'
+        params = [expression]
+        if sender is not None:
+            sql += ' AND sender = ?'
+            params.append(sender)
+        if thread is not None:
+            sql += ' AND thread = ?'
+            params.append(thread)
+        if thread_key is not None:
+            sql += ' AND thread_key = ?'
+            params.append(thread_key)
+        if start is not None:
+            sql += ' AND ts >= ?'
+            params.append(pd.Timestamp(start).value)
+        if end is not None:
+            sql += ' AND ts < ?'
+            params.append(pd.Timestamp(end).value)
+        if self.keyed:
+            # Ids to the rows they are at; messages of threads not loaded have none
+            sql = ('SELECT r.row + m.rowid - r.first_id AS row FROM (' + sql + ') AS m '
+                   'JOIN ranges AS r ON r.first_id = (SELECT MAX(first_id) FROM ranges WHERE first_id <= m.rowid) '
+                   'WHERE r.row IS NOT NULL ORDER BY row')
+        else:
+            sql += ' ORDER BY rowid'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
         
-        fig.update_layout(
-            plot_bgcolor='#303030',
-            paper_bgcolor='#303030',
-            font=dict(color='#A0A0A0'),
-            margin=dict(l=40, r=10, t=10, b=20),
-            xaxis=dict(
-                showgrid=False,
-                showticklabels=False,
-                showline=False,
-                color='#A0A0A0'
-            ),
-            yaxis=dict(
-                showgrid=False,
-                color='#A0A0A0',
-                showline=True,
-                linecolor='#A0A0A0',
-                range=[24, 0],  # Reverse so midnight is at top
-                tickvals=list(range(0, 25, 4)),
-                ticktext=['12AM', '4AM', '8AM', '12PM', '4PM', '8PM', '12AM']
-            ),
-            showlegend=False,
-            height=None
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    
+    def save(self, path, metadata=None):
+        """Copy the index to an SQLite file at ``path``, replacing any file there.
+        
+        ``metadata`` is stored with it as strings (see ``metadata()``). The
+        copy is written next to ``path`` and moved over it, so readers that
+        have the old file open keep reading it.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        target = sqlite3.connect(str(tmp_path))
+        try:
+            with self.lock:
+                self.conn.backup(target)
+            target.execute('CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)')
+            target.executemany('INSERT OR REPLACE INTO metadata VALUES (?, ?)', (metadata or {}).items())
+            target.commit()
+        finally:
+            target.close()
+        os.replace(tmp_path, path)
+    
+    def metadata(self):
+        """The ``metadata`` the index was saved with, empty if none."""
+        with self.lock:
+            try:
+                return dict(self.conn.execute('SELECT key, value FROM metadata'))
+            except sqlite3.OperationalError:
+                return {}
+
+
+class ParseCache:
+    """On-disk cache of per-file parse results, backed by SQLite.
+    
+    Entries are keyed by absolute path and validated against the file size,
+    mtime and a content hash, so only new or modified files are parsed again.
+    A file whose mtime changed but whose content did not is still a hit.
+    """
+    
+    # Bump when the record schema or extraction rules change
+    VERSION = 4
+    DEFAULT_DIR = '.fbmessage_cache'
+    
+    def __init__(self, cache_dir=DEFAULT_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / 'parse_cache.sqlite3'
+        # The parser's search index, see MessageSearchIndex
+        self.search_path = self.cache_dir / 'search_index.sqlite3'
+        # An ExportWatcher parses (and so uses the cache) on its own thread
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, '
+            'content_hash TEXT, version INTEGER, result BLOB)'
         )
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def content_hash(file_path, data=None):
+        """Hash the file contents, ``data`` if they were read already, else the file in chunks.
+        
+        ZIP members use the CRC-32 from the archive directory instead, which
+        avoids decompressing them.
+        """
+        if isinstance(file_path, ZipMember):
+            return f"crc32:{file_path.crc:08x}"
+        if data is not None:
+            return hashlib.blake2b(data, digest_size=16).hexdigest()
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def key(file_path):
+        """Cache key: the absolute path, or archive path plus member name."""
+        if isinstance(file_path, ZipMember):
+            return str(file_path)
+        return str(Path(file_path).resolve())
+    
+    @staticmethod
+    def stat(file_path):
+        """``os.stat`` that also accepts ZIP members."""
+        if isinstance(file_path, ZipMember):
+            return file_path.stat()
+        return os.stat(file_path)
+    
+    def get(self, file_path):
+        """Return the cached result for ``file_path``, or ``None`` if it is stale."""
+        return self.load(file_path) if self.is_fresh(file_path) else None
+    
+    def is_fresh(self, file_path):
+        """Whether the cached result for ``file_path`` is still valid, without loading it."""
+        key = self.key(file_path)
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, content_hash, version FROM files WHERE path = ?', (key,)
+        ).fetchone()
         
-        return fig
+        if row is None or row[3] != self.VERSION:
+            self.misses += 1
+            return False
+        
+        size, mtime_ns, content_hash, _ = row
+        stat = self.stat(file_path)
+        if stat.st_size != size:
+            self.misses += 1
+            return False
+        
+        if stat.st_mtime_ns != mtime_ns:
+            # Touched but possibly unchanged: fall back to comparing contents
+            if self.content_hash(file_path) != content_hash:
+                self.misses += 1
+                return False
+            self.conn.execute('UPDATE files SET mtime_ns = ? WHERE path = ?', (stat.st_mtime_ns, key))
+        
+        self.hits += 1
+        return True
+    
+    def load(self, file_path):
+        """The cached result for ``file_path``, which ``is_fresh`` has checked."""
+        row = self.conn.execute('SELECT result FROM files WHERE path = ?', (self.key(file_path),)).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+    
+    def put(self, file_path, result, content_hash=None):
+        """Store the parse result of ``file_path``.
+        
+        ``content_hash`` is its ``content_hash`` when known; otherwise the
+        file is read again to compute it.
+        """
+        stat = self.stat(file_path)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+            (self.key(file_path), stat.st_size, stat.st_mtime_ns,
+             content_hash or self.content_hash(file_path), self.VERSION,
+             pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        )
     
-    def create_date_density_plot(self):
-        """Create date density plot (horizontal, showing message count by date)."""
-        daily_counts = self.df.groupby('date_only').size().reset_index(name='count')
+    def signature(self, file_paths):
+        """Identify the cached contents of ``file_paths``, or ``None`` if one is not cached as it is now.
         
-        fig = go.Figure()
+        Threads read from files with the same signature have the same messages.
+        """
+        digest = hashlib.blake2b(str(self.VERSION).encode(), digest_size=16)
+        for file_path in file_paths:
+            key = self.key(file_path)
+            row = self.conn.execute('SELECT size, mtime_ns, content_hash FROM files WHERE path = ?',
+                                    (key,)).fetchone()
+            stat = self.stat(file_path)
+            if row is None or row[:2] != (stat.st_size, stat.st_mtime_ns):
+                return None
+            digest.update(f"{key}\0{row[2]}\0".encode())
+        return digest.hexdigest()
+    
+    def commit(self):
+        """Flush pending writes to disk."""
+        self.conn.commit()
+    
+    def close(self):
+        """Commit and close the database."""
+        self.conn.commit()
+        self.conn.close()
+
+
+class MessageDataset:
+    """Parquet dataset of parsed messages, partitioned by year (and thread).
+    
+    Files are laid out hive-style (``year=2021/part-0.parquet``, or
+    ``year=2021/thread_key=.../part-0.parquet``) and compressed with zstd;
+    thread, sender and file path columns are dictionary encoded. Reading
+    projects columns and pushes date, sender and thread filters down to the
+    partition and row group level, so a narrow view never decodes the rest.
+    
+    Requires the optional ``pyarrow`` package.
+    """
+    
+    VERSION = 2
+    METADATA_FILE = '_fbmessage_dataset.json'
+    COMPRESSION = 'zstd'
+    DICTIONARY_COLUMNS = ('thread_title', 'thread_key', 'sender_name', 'file_path')
+    
+    def __init__(self, path):
+        self.require_pyarrow()
+        self.path = Path(path)
+        metadata_path = self.path / self.METADATA_FILE
+        if not metadata_path.exists():
+            raise ValueError(f"Not a message dataset (no {self.METADATA_FILE}): {self.path}")
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get('version') != self.VERSION:
+            raise ValueError(f"Unsupported message dataset version {self.metadata.get('version')}: {self.path}")
         
-        fig.add_trace(go.Scatter(
-            x=daily_counts['date_only'],
-            y=daily_counts['count'],
-            fill='tozeroy',
-            fillcolor='rgba(44, 123, 182, 0.7)',
-            line=dict(color='#2c7bb6', width=1),
-            mode='lines',
-            showlegend=False
+        self.participants = set(self.metadata['participants'])
+        partition_schema = self.schema().empty_table().select(self.metadata['partitioning']).schema
+        # Dictionary columns used as partition keys come back as plain strings from the path
+        partition_schema = pa.schema([
+            pa.field(field.name, pa.string()) if pa.types.is_dictionary(field.type) else field
+            for field in partition_schema
+        ])
+        file_format = pa_ds.ParquetFileFormat(read_options=pa_ds.ParquetReadOptions(
+            dictionary_columns=[c for c in self.DICTIONARY_COLUMNS if c not in self.metadata['partitioning']]
         ))
+        self.dataset = pa_ds.dataset(str(self.path), format=file_format,
+                                     partitioning=pa_ds.partitioning(partition_schema, flavor='hive'),
+                                     exclude_invalid_files=True)
+    
+    @staticmethod
+    def available():
+        """Whether pyarrow is installed (importing it if so)."""
+        return _import_pyarrow()
+    
+    @classmethod
+    def require_pyarrow(cls):
+        """Raise ImportError with an install hint when pyarrow is missing."""
+        if not cls.available():
+            raise ImportError("Parquet datasets require pyarrow: pip install pyarrow")
+    
+    @classmethod
+    def schema(cls):
+        """Arrow schema of the stored columns, including the year partition key."""
+        cls.require_pyarrow()
+        return pa.schema([
+            ('thread_title', pa.dictionary(pa.int32(), pa.string())),
+            ('thread_key', pa.dictionary(pa.int32(), pa.string())),
+            ('sender_name', pa.dictionary(pa.int32(), pa.string())),
+            ('timestamp', pa.timestamp('ns')),
+            ('content', pa.string()),
+            ('reactions', pa.list_(pa.string())),
+            ('file_path', pa.dictionary(pa.int32(), pa.string())),
+            ('year', pa.int16()),
+        ])
+    
+    @classmethod
+    def write(cls, df, path, participants=(), partition_by_thread=False):
+        """Write a message DataFrame (``MessageStore.to_dataframe()`` columns) to ``path``.
+        
+        An existing dataset at ``path`` is replaced as a whole: the new one is
+        written next to it and swapped in, so no partition of the old one is
+        left behind. Any other non-empty directory at ``path`` is refused.
+        """
+        cls.require_pyarrow()
+        path = Path(path)
+        if path.exists() and not (path / cls.METADATA_FILE).exists() and any(path.iterdir()):
+            raise ValueError(f"Not replacing {path}: it is not empty and not a message dataset")
+        schema = cls.schema()
         
-        fig.update_layout(
-            plot_bgcolor='#303030',
-            paper_bgcolor='#303030',
-            font=dict(color='#A0A0A0'),
-            margin=dict(l=40, r=20, t=10, b=30),
-            xaxis=dict(
-                showgrid=True,
-                gridcolor='#404040',
-                color='#A0A0A0',
-                showline=True,
-                linecolor='#A0A0A0'
-            ),
-            yaxis=dict(
-                showgrid=False,
-                showticklabels=False,
-                showline=False,
-                color='#A0A0A0'
-            ),
-            showlegend=False,
-            height=None
+        table = pa.Table.from_pandas(df[[name for name in schema.names if name != 'year']],
+                                     preserve_index=False)
+        table = table.append_column('year', pa.array(df['timestamp'].dt.year.to_numpy(), pa.int16()))
+        table = table.cast(schema)
+        
+        partitioning = ['year', 'thread_key'] if partition_by_thread else ['year']
+        partition_schema = pa.schema([
+            pa.field(name, pa.string()) if name == 'thread_key' else schema.field(name)
+            for name in partitioning
+        ])
+        if partition_by_thread:
+            table = table.set_column(table.schema.get_field_index('thread_key'), 'thread_key',
+                                     table.column('thread_key').cast(pa.string()))
+        
+        n_partitions = len(table.select(partitioning).group_by(partitioning).aggregate([])) if len(table) else 1
+        tmp_path = path.with_name(path.name + '.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        pa_ds.write_dataset(
+            table, str(tmp_path), format='parquet',
+            partitioning=pa_ds.partitioning(partition_schema, flavor='hive'),
+            file_options=pa_ds.ParquetFileFormat().make_write_options(compression=cls.COMPRESSION),
+            basename_template='part-{i}.parquet',
+            max_partitions=max(1024, n_partitions),
         )
         
-        return fig
+        with open(tmp_path / cls.METADATA_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'version': cls.VERSION, 'partitioning': partitioning,
+                       'rows': len(table), 'participants': sorted(participants)},
+                      f, indent=2, ensure_ascii=False)
+        
+        if path.exists():
+            old_path = path.with_name(path.name + '.old')
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+        return cls(path)
     
-    def run(self, debug=True, port=8050):
-        """Run the Dash app."""
-        print(f"Starting Facebook Message Explorer on http://localhost:{port}")
-        self.app.run(debug=debug, port=port)  # Use app.run instead of app.run_server
+    @classmethod
+    def filter_expression(cls, start=None, end=None, senders=None, threads=None, thread_keys=None):
+        """Arrow filter for a date range (``end`` exclusive) and sender/thread sets.
+        
+        ``threads`` are thread titles and ``thread_keys`` the keys of threads
+        (see ``FacebookMessageParser.thread_key``); only the keys prune the
+        partitions of a dataset written with ``partition_by_thread``, titles
+        are matched row by row.
+        """
+        cls.require_pyarrow()
+        conditions = []
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions.append(pa_ds.field('year') >= start.year)
+            conditions.append(pa_ds.field('timestamp') >= pa.scalar(start.value, pa.timestamp('ns')))
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append(pa_ds.field('year') <= end.year)
+            conditions.append(pa_ds.field('timestamp') < pa.scalar(end.value, pa.timestamp('ns')))
+        if senders is not None:
+            conditions.append(pa_ds.field('sender_name').isin(list(senders)))
+        if thread_keys is not None:
+            conditions.append(pa_ds.field('thread_key').isin(list(thread_keys)))
+        if threads is not None:
+            conditions.append(pa_ds.field('thread_title').isin(list(threads)))
+        
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+    
+    def to_dataframe(self, columns=None, start=None, end=None, senders=None, threads=None, thread_keys=None):
+        """Load the dataset as a MessageFrame, which derives its other columns on access.
+        
+        ``columns`` limits which stored columns are read; the filters are as
+        for ``filter_expression``.
+        """
+        stored = [name for name in self.schema().names if name != 'year']
+        columns = stored if columns is None else [name for name in stored if name in columns]
+        table = self.dataset.to_table(columns=columns,
+                                      filter=self.filter_expression(start, end, senders, threads, thread_keys))
+        
+        df = table.to_pandas()
+        for name in self.DICTIONARY_COLUMNS:
+            if name in df and not isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype('category')
+        if 'reactions' in df:
+            # Same form as MessageStore.to_dataframe(): one tuple per message
+            df['reactions'] = [tuple(r) if r is not None and len(r) else () for r in df['reactions']]
+        return MessageFrame(df)
+    
+    def get_summary_stats(self, df):
+        """Summary statistics of a loaded DataFrame, shaped like the parser's."""
+        return _frame_summary_stats(df, self.participants)
+
+
+def _frame_summary_stats(df, participants):
+    """Summary statistics of a message DataFrame, shaped like the parser's."""
+    if df.empty:
+        return {}
+    
+    # Keyed by inbox folder id like the parser's, so same-titled threads stay apart
+    threads = df['thread_key'].value_counts(sort=False)
+    return {
+        'total_messages': len(df),
+        'total_participants': len(participants),
+        'total_threads': int((threads > 0).sum()),
+        'participants': list(participants),
+        'threads': {key: int(count) for key, count in threads.items() if count},
+        'date_range': {'start': df['timestamp'].min().to_pydatetime(),
+                       'end': df['timestamp'].max().to_pydatetime()}
+    }
+
+
+class MessageMapFile:
+    """Uncompressed Arrow IPC file of parsed messages, read through a memory map.
+    
+    The columns of ``to_dataframe()`` are views of the mapped file rather
+    than copies, so any number of processes serving the same file (see
+    wsgi.py) share one copy of it in the page cache. A fingerprint of the
+    messages is stored with them, so readers need not hash them again, and
+    their search index is saved next to the file, for every process to open
+    read-only (see ``search_index``).
+    
+    Requires the optional ``pyarrow`` package.
+    """
+    
+    VERSION = 2
+    METADATA_KEY = b'fbmessage'
+    SEARCH_SUFFIX = '.search.sqlite3'
+    
+    def __init__(self, path):
+        MessageDataset.require_pyarrow()
+        self.path = Path(path)
+        self.table = pa.ipc.open_file(pa.memory_map(str(self.path), 'r')).read_all()
+        metadata = (self.table.schema.metadata or {}).get(self.METADATA_KEY)
+        if metadata is None:
+            raise ValueError(f"Not a message file: {self.path}")
+        self.metadata = json.loads(metadata)
+        if self.metadata.get('version') != self.VERSION:
+            raise ValueError(f"Unsupported message file version {self.metadata.get('version')}: {self.path}")
+        self.participants = set(self.metadata['participants'])
+        self.fingerprint = self.metadata['fingerprint']
+    
+    @classmethod
+    def search_path(cls, path):
+        """Where the search index of the message file at ``path`` is saved."""
+        path = Path(path)
+        return path.with_name(path.name + cls.SEARCH_SUFFIX)
+    
+    @classmethod
+    def write(cls, df, path, participants=(), search_index=None):
+        """Write a message DataFrame to ``path``, replacing any file there.
+        
+        The file is written next to ``path`` and moved over it, so processes
+        that still map the old file keep reading it unharmed. ``search_index``
+        is the MessageSearchIndex of ``df``, built from it if not given.
+        """
+        MessageDataset.require_pyarrow()
+        path = Path(path)
+        fingerprint = message_fingerprint(df)
+        if search_index is None:
+            search_index = MessageSearchIndex.from_dataframe(df)
+        search_index.save(cls.search_path(path), {'fingerprint': fingerprint})
+        columns = {}
+        for name in MessageDataset.DICTIONARY_COLUMNS:
+            values = df[name].astype('category').cat
+            # Codes in the width pandas uses, so they are not widened on load
+            columns[name] = pa.DictionaryArray.from_arrays(
+                pa.array(values.codes.to_numpy()), pa.array(values.categories.astype(str).tolist(), pa.string()))
+        columns['timestamp'] = pa.array(df['timestamp'].to_numpy(dtype='datetime64[ns]'), pa.timestamp('ns'))
+        # Large types are what pandas' Arrow-backed columns use
+        columns['content'] = pa.array(df['content'], pa.large_string())
+        columns['reactions'] = pa.array([list(r) for r in df['reactions']], pa.list_(pa.large_string()))
+        
+        table = pa.table(columns).combine_chunks()
+        table = table.replace_schema_metadata({cls.METADATA_KEY: json.dumps({
+            'version': cls.VERSION,
+            'rows': len(table),
+            'participants': sorted(participants),
+            'fingerprint': fingerprint,
+        }, ensure_ascii=False)})
+        
+        tmp_path = path.with_name(path.name + '.tmp')
+        with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        return cls(path)
+    
+    def _column(self, name):
+        column = self.table.column(name)
+        return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    
+    def to_dataframe(self):
+        """The messages as a MessageFrame whose columns are views of the mapped file."""
+        columns = {}
+        for name in ('thread_title', 'thread_key', 'sender_name'):
+            array = self._column(name)
+            columns[name] = pd.Categorical.from_codes(array.indices.to_numpy(zero_copy_only=True),
+                                                      array.dictionary.to_pandas())
+        columns['timestamp'] = self._column('timestamp').to_numpy(zero_copy_only=True)
+        # Wrapped as an Arrow-typed column, which every pandas from 1.5 on keeps as is
+        columns['content'] = pd.arrays.ArrowExtensionArray(self.table.column('content'))
+        # Lists of reactions stay in Arrow too, rather than one tuple per message
+        columns['reactions'] = pd.arrays.ArrowExtensionArray(self.table.column('reactions'))
+        array = self._column('file_path')
+        columns['file_path'] = pd.Categorical.from_codes(array.indices.to_numpy(zero_copy_only=True),
+                                                         array.dictionary.to_pandas())
+        return MessageFrame(columns, copy=False)
+    
+    def search_index(self):
+        """The read-only search index saved with the messages, or ``None``.
+        
+        ``None`` when there is no index next to the file, or it was saved for
+        other messages.
+        """
+        path = self.search_path(self.path)
+        if not path.exists():
+            return None
+        index = MessageSearchIndex(path, read_only=True)
+        if index.metadata().get('fingerprint') != self.fingerprint:
+            return None
+        return index
+    
+    def get_summary_stats(self, df):
+        """Summary statistics of the loaded DataFrame, shaped like the parser's."""
+        return _frame_summary_stats(df, self.participants)
+
+
+def top_conversations(df, n=5):
+    """Message counts of the ``n`` largest threads, by ``thread_key``, labelled with their titles."""
+    counts = df['thread_key'].value_counts().head(n)
+    titles = df[['thread_key', 'thread_title']].drop_duplicates('thread_key').set_index('thread_key')['thread_title']
+    return pd.Series(counts.to_numpy(), index=titles.loc[counts.index].astype(str).to_numpy(), name='count')
+
+
+def message_fingerprint(df):
+    """Digest of the timestamp, sender, thread and text of every message in ``df``."""
+    row_hashes = pd.util.hash_pandas_object(
+        df[['timestamp', 'sender_name', 'thread_title', 'thread_key', 'content']], index=False)
+    return hashlib.blake2b(row_hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+class ParseMetrics:
+    """Stage timers, throughput counters and error tallies for a parse run.
+    
+    Stage times are exclusive: while a nested stage runs (``normalize`` inside
+    ``extract``, say) the enclosing one is paused, so every second is charged
+    to exactly one stage. With worker processes each worker's snapshot is
+    merged in, so stage times then add up CPU time over all processes and may
+    exceed the wall clock time of the run.
+    """
+    
+    STAGES = ('read', 'tree_build', 'extract', 'normalize', 'timestamp_parse', 'cache', 'merge')
+    # Example messages kept per error category
+    MAX_ERROR_SAMPLES = 5
+    # Minimum seconds between two progress reports
+    PROGRESS_INTERVAL = 1.0
+    
+    def __init__(self, progress_callback=None, profile_path=None, trace_memory=False):
+        self.progress_callback = progress_callback
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.stage_seconds = dict.fromkeys(self.STAGES, 0.0)
+        self.counters = Counter()
+        self.errors = Counter()
+        self.error_samples = defaultdict(list)
+        self.info = {}
+        self.total_files = 0
+        self.started = None
+        self.elapsed = 0.0
+        self.peak_memory = None
+        self._stack = []
+        self._stages = {}
+        self._last_progress = 0.0
+        self._profiler = None
+    
+    def stage(self, name):
+        """Context manager timing the ``name`` stage; cheap enough for hot loops."""
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _MetricsStage(self, name)
+        return stage
+    
+    def _enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.stage_seconds[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+    
+    def _exit(self):
+        now = time.perf_counter()
+        name, since = self._stack.pop()
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + now - since
+        if self._stack:
+            self._stack[-1][1] = now
+    
+    def record_error(self, category, message, count=1):
+        """Count an error under ``category`` and keep the first few messages."""
+        self.errors[category] += count
+        samples = self.error_samples[category]
+        if len(samples) < self.MAX_ERROR_SAMPLES:
+            samples.append(message)
+    
+    def start(self, total_files, **info):
+        """Begin a run over ``total_files`` files and start any profiling hooks."""
+        self.total_files += total_files
+        self.info.update(info)
+        self.started = time.perf_counter()
+        self._last_progress = self.started
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+    
+    def finish(self):
+        """End the run, stopping the profiling hooks started by ``start``."""
+        self.elapsed += time.perf_counter() - self.started
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    
+    def file_done(self, size, messages, cached=False):
+        """Account for one merged file of ``size`` bytes."""
+        self.counters['files'] += 1
+        self.counters['bytes'] += size
+        self.counters['messages'] += messages
+        if cached:
+            self.counters['cached_files'] += 1
+    
+    def throughput(self):
+        """Files, megabytes and messages per second since ``start``, plus ETA."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        files = self.counters['files']
+        files_per_s = files / elapsed
+        remaining = self.total_files - files
+        return {
+            'files_per_s': files_per_s,
+            'mb_per_s': self.counters['bytes'] / 1e6 / elapsed,
+            'messages_per_s': self.counters['messages'] / elapsed,
+            'eta_s': remaining / files_per_s if files_per_s else None,
+        }
+    
+    def progress(self, force=False):
+        """Report progress at most once per PROGRESS_INTERVAL seconds.
+        
+        The report goes to ``progress_callback`` as a dict when one was given,
+        otherwise a single line is printed.
+        """
+        now = time.perf_counter()
+        done = self.counters['files']
+        if not force and done < self.total_files and now - self._last_progress < self.PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        
+        rates = self.throughput()
+        status = {'files': done, 'total_files': self.total_files,
+                  'messages': self.counters['messages'], **rates}
+        if self.progress_callback is not None:
+            self.progress_callback(status)
+            return
+        
+        eta = f", ETA {rates['eta_s']:.0f}s" if rates['eta_s'] and done < self.total_files else ""
+        print(f"Processed {done}/{self.total_files} files "
+              f"({rates['files_per_s']:.1f} files/s, {rates['mb_per_s']:.1f} MB/s, "
+              f"{rates['messages_per_s']:,.0f} messages/s{eta})")
+    
+    def snapshot(self):
+        """Picklable copy of the stage times and error counters."""
+        return {
+            'stage_seconds': dict(self.stage_seconds),
+            'errors': dict(self.errors),
+            'error_samples': dict(self.error_samples),
+        }
+    
+    def merge(self, snapshot):
+        """Fold a ``snapshot`` from another parser (a worker process) into this one."""
+        for name, seconds in snapshot['stage_seconds'].items():
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+        for category, count in snapshot['errors'].items():
+            self.errors[category] += count
+            samples = self.error_samples[category]
+            samples.extend(snapshot['error_samples'].get(category, [])[:self.MAX_ERROR_SAMPLES - len(samples)])
+    
+    def report(self):
+        """Machine-readable summary of the run."""
+        elapsed = max(self.elapsed, 1e-9)
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            **self.info,
+            'wall_seconds': round(self.elapsed, 6),
+            'files': self.counters['files'],
+            'cached_files': self.counters['cached_files'],
+            'bytes': self.counters['bytes'],
+            'messages': self.counters['messages'],
+            'duplicates': self.counters['duplicates'],
+            'throughput': {
+                'files_per_s': round(self.counters['files'] / elapsed, 3),
+                'mb_per_s': round(self.counters['bytes'] / 1e6 / elapsed, 3),
+                'messages_per_s': round(self.counters['messages'] / elapsed, 3),
+            },
+            'stage_seconds': {name: round(seconds, 6) for name, seconds in self.stage_seconds.items()},
+            'errors': dict(self.errors),
+            'error_samples': dict(self.error_samples),
+            'peak_memory_mb': round(self.peak_memory / 1e6, 3) if self.peak_memory is not None else None,
+            'profile': str(self.profile_path) if self.profile_path else None,
+        }
+    
+    def write_report(self, path):
+        """Write ``report()`` to ``path`` as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+
+class _MetricsStage:
+    """Reusable context manager for one ParseMetrics stage."""
+    
+    __slots__ = ('metrics', 'name')
+    
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+    
+    def __enter__(self):
+        self.metrics._enter(self.name)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.metrics._exit()
+        return False
+
+
+class ZipMember:
+    """A message file inside a ZIP archive of an export.
+    
+    Stands in for a ``Path`` where message files are handled (``name``,
+    ``suffix``, ``parent`` and ``stat()``) and is read straight out of the
+    archive. It pickles as the archive path plus member metadata, so worker
+    processes open the archive themselves.
+    """
+    
+    __slots__ = ('archive', 'member', 'file_size', 'crc', 'mtime_ns')
+    
+    # messages/inbox/<thread>/message_N.html|json, optionally under your_facebook_activity/
+    MESSAGE_MEMBER = re.compile(r'(?:^|/)messages/inbox/.+/message[^/]*\.(?:html|json)$', re.IGNORECASE)
+    
+    # Open archives of this process, keyed by (pid, path) so that a forked
+    # worker never shares a file offset with its parent
+    _archives = {}
+    
+    def __init__(self, archive, info):
+        self.archive = str(archive)
+        self.member = info.filename
+        self.file_size = info.file_size
+        self.crc = info.CRC
+        self.mtime_ns = int(datetime(*info.date_time).timestamp() * 1e9)
+    
+    @classmethod
+    def find_message_files(cls, archive):
+        """Message members of ``archive``, listed from its central directory."""
+        archive = Path(archive).resolve()
+        with zipfile.ZipFile(archive) as zf:
+            return [cls(archive, info) for info in zf.infolist()
+                    if not info.is_dir() and cls.MESSAGE_MEMBER.search(info.filename)]
+    
+    @property
+    def name(self):
+        return PurePosixPath(self.member).name
+    
+    @property
+    def suffix(self):
+        return PurePosixPath(self.member).suffix
+    
+    @property
+    def parent(self):
+        """Folder inside the archive, shared by the parts of a split export."""
+        return PurePosixPath(self.member).parent
+    
+    def stat(self):
+        """Uncompressed size and modification time from the archive directory."""
+        return SimpleNamespace(st_size=self.file_size, st_mtime_ns=self.mtime_ns)
+    
+    def open(self):
+        """Binary stream that decompresses the member as it is read."""
+        key = (os.getpid(), self.archive)
+        zf = self._archives.get(key)
+        if zf is None:
+            zf = self._archives[key] = zipfile.ZipFile(self.archive)
+        return zf.open(self.member)
+    
+    @classmethod
+    def close_archives(cls):
+        """Close the archives this process has opened."""
+        for key in [key for key in cls._archives if key[0] == os.getpid()]:
+            cls._archives.pop(key).close()
+    
+    def __str__(self):
+        return f"{self.archive}/{self.member}"
+    
+    def __repr__(self):
+        return f"ZipMember({self.archive!r}, {self.member!r})"
+
+
+def _open_message_file(file_path, text=False, data=None):
+    """Open a message file on disk or inside a ZIP archive for reading.
+    
+    With ``data`` (the already-read file contents) nothing is opened and the
+    bytes are read from memory instead.
+    """
+    if data is not None:
+        f = io.BytesIO(data)
+        return io.TextIOWrapper(f, encoding='utf-8', errors='ignore') if text else f
+    if isinstance(file_path, ZipMember):
+        f = file_path.open()
+        return io.TextIOWrapper(f, encoding='utf-8', errors='ignore') if text else f
+    if text:
+        return open(file_path, 'r', encoding='utf-8', errors='ignore')
+    return open(file_path, 'rb')
+
+
+# The parser of a pool worker process, see _init_worker
+_worker_parser = None
+
+
+def _init_worker(backend):
+    """Process pool initializer: create the parser every file of the worker is parsed with.
+    
+    One parser per process, rather than per file, keeps its memoized names,
+    titles and timestamp formats from one file to the next.
+    """
+    global _worker_parser
+    _worker_parser = FacebookMessageParser(backend=backend)
+
+
+def _extract_file_worker(file_path, data=None):
+    """Process pool entry point: parse one file with the worker's parser.
+    
+    Returns the result together with a snapshot of the metrics of this file
+    alone, which the parent folds into its own ParseMetrics.
+    """
+    parser = _worker_parser
+    parser.metrics = ParseMetrics()
+    return parser.extract_file(file_path, data), parser.metrics.snapshot()
+
+
+def _hashed(prefetched, content_hashes, metrics):
+    """Pass ``(file, data)`` pairs through, appending the ``ParseCache.content_hash`` of each.
+    
+    ``None`` is appended for files without data, which are hashed from disk.
+    """
+    for file_path, data in prefetched:
+        with metrics.stage('cache'):
+            content_hashes.append(None if data is None else ParseCache.content_hash(file_path, data))
+        yield file_path, data
+
+
+def _pool_results(executor, prefetched, window):
+    """Parse ``(file, data)`` pairs in a process pool, yielding results in order.
+    
+    At most ``window`` files are in flight at once, so prefetched bytes are
+    not all queued up in the pool when parsing is the bottleneck.
+    """
+    pending = deque()
+    for file_path, data in prefetched:
+        pending.append(executor.submit(_extract_file_worker, file_path, data))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class FilePrefetcher:
+    """Read message files ahead of the parser on a small thread pool.
+    
+    Iterating yields ``(file, data)`` pairs in the original order. Reads are
+    issued in that order too, which keeps access sequential on slow disks,
+    and are bounded by ``depth`` files and ``read_ahead`` bytes (by file size)
+    not yet handed out, so memory stays capped when parsing falls behind. A
+    file larger than ``read_ahead`` is still read once the queue is empty.
+    A file that cannot be read comes out with ``data`` set to ``None``, so
+    the parser reports the error when it tries to open it itself.
+    """
+    
+    DEFAULT_DEPTH = 8
+    DEFAULT_READ_AHEAD = 64 * 1024 * 1024
+    DEFAULT_READERS = 2
+    
+    def __init__(self, files, depth=None, read_ahead=None, readers=None, metrics=None):
+        self.files = files
+        self.depth = max(1, depth or self.DEFAULT_DEPTH)
+        self.read_ahead = self.DEFAULT_READ_AHEAD if read_ahead is None else read_ahead
+        self.readers = max(1, readers or self.DEFAULT_READERS)
+        # Time spent waiting on a read is charged to its 'read' stage
+        self.metrics = metrics
+    
+    @staticmethod
+    def _read(file_path):
+        try:
+            with _open_message_file(file_path) as f:
+                return f.read()
+        except Exception:
+            # Not only OSError: a corrupt ZIP member raises BadZipFile or zlib.error
+            return None
+    
+    def __iter__(self):
+        files = iter(self.files)
+        pending = deque()
+        buffered = 0
+        pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix='prefetch')
+        try:
+            while True:
+                # Top up the queue until it is deep enough or the byte budget is used
+                while len(pending) < self.depth and (not pending or buffered < self.read_ahead):
+                    file_path = next(files, None)
+                    if file_path is None:
+                        break
+                    try:
+                        size = ParseCache.stat(file_path).st_size
+                    except OSError:
+                        size = 0
+                    pending.append((file_path, size, pool.submit(self._read, file_path)))
+                    buffered += size
+                
+                if not pending:
+                    return
+                
+                file_path, size, future = pending.popleft()
+                buffered -= size
+                if self.metrics is not None:
+                    with self.metrics.stage('read'):
+                        data = future.result()
+                else:
+                    data = future.result()
+                yield file_path, data
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ExportWatcher:
+    """Poll an export for new and changed message files and parse them in the background.
+    
+    Every ``interval`` seconds the export is listed again (as by
+    ``find_message_files``) and files whose size or mtime changed since the
+    last look are handed to ``parser.parse_files``, which only adds the
+    messages not seen before. If that added any, ``on_update(parser, start)``
+    is then called from the watcher thread with the row the new messages
+    start at, for instance to append them to a running dashboard. Polling
+    needs no extra dependencies and works the same for directories and ZIP
+    archives; a file still being written is simply parsed again once it
+    changes no more.
+    """
+    
+    DEFAULT_INTERVAL = 5.0
+    
+    def __init__(self, parser, sources, interval=DEFAULT_INTERVAL, on_update=None, **parse_options):
+        self.parser = parser
+        self.sources = sources if isinstance(sources, (list, tuple)) else [sources]
+        self.interval = interval
+        self.on_update = on_update
+        self.parse_options = parse_options
+        # Size and mtime of every file as last parsed, by ParseCache.key
+        self.signatures = {}
+        self.updates = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def scan(self):
+        """Current message files and their (size, mtime) signatures."""
+        files = self.parser.find_message_files([Path(source) for source in self.sources])
+        signatures = {}
+        for file_path in files:
+            try:
+                stat = ParseCache.stat(file_path)
+            except OSError:
+                continue
+            signatures[ParseCache.key(file_path)] = (stat.st_size, stat.st_mtime_ns)
+        return files, signatures
+    
+    def mark_seen(self):
+        """Take the files as they are now as parsed, e.g. right after ``parse_directory``."""
+        self.signatures = self.scan()[1]
+    
+    def poll(self):
+        """Parse the files that are new or changed since the last poll; return how many there were."""
+        files, signatures = self.scan()
+        # Files that could not be stat'ed have no signature and are left for later
+        changed = [f for f in files if signatures.get(ParseCache.key(f)) != self.signatures.get(ParseCache.key(f))]
+        start = len(self.parser.messages)
+        if changed:
+            self.parser.parse_files(changed, source=', '.join(map(str, self.sources)), **self.parse_options)
+        # Only now, so files whose parse raised are tried again next time
+        self.signatures = signatures
+        # A file touched or rewritten with the same messages adds nothing
+        if len(self.parser.messages) == start:
+            return len(changed)
+        
+        self.updates += 1
+        if self.on_update is not None:
+            self.on_update(self.parser, start)
+        return len(changed)
+    
+    def start(self):
+        """Poll on a daemon thread until ``stop`` is called."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='export-watcher', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop polling and wait for a parse in progress to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # Keep watching; the next poll retries whatever failed
+                self.parser.metrics.record_error('watch', str(e))
+                print(f"Watch error: {e}")
+
+
+class _JSONStream:
+    """Minimal incremental reader for the top level of a JSON thread file.
+    
+    Top-level values are decoded whole, except the ``messages`` array whose
+    elements are decoded and yielded one by one.
+    """
+    
+    NUMBER_CONTINUATION = frozenset('.eE+-')
+    
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self):
+        """Read the next chunk, dropping the already consumed part of the buffer."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def _peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+    
+    def _expect(self, chars):
+        """Consume the next character, which must be one of ``chars``."""
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, got {char!r}")
+        self.pos += 1
+        return char
+    
+    def _value(self):
+        """Decode the next complete JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number ending at the buffer end, or before a '.', exponent or
+                # sign, may have been cut by the chunk boundary ("2." decodes as 2)
+                complete = end < len(self.buf) and not (
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and self.buf[end] in self.NUMBER_CONTINUATION)
+                if complete or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+    
+    def iter_thread_items(self):
+        """Yield ``(key, value)`` pairs, with one ``('messages', msg)`` pair per message."""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'messages' and self._peek() == '[':
+                self._expect('[')
+                if self._peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                yield key, self._value()
+            if self._expect(',}') == '}':
+                return
 
 
 def main():
     """Main function to parse arguments and run the application."""
     parser = argparse.ArgumentParser(description='Facebook Message HTML Parser and Visualizer')
-    parser.add_argument('input_path', help='Path to Facebook data export directory containing HTML files')
+    parser.add_argument('input_path', nargs='+',
+                        help='Facebook data export directory, or the ZIP archive(s) of the export as downloaded; '
+                             'messages repeated across several exports are kept once')
     parser.add_argument('--port', '-p', type=int, default=8050, help='Port for web server (default: 8050)')
-    parser.add_argument('--parse-only', action='store_true', help='Only parse HTML files and show stats, do not start visualizer')
+    parser.add_argument('--parse-only', action='store_true', help='Only parse message files and show stats, do not start visualizer')
+    parser.add_argument('--backend', choices=FacebookMessageParser.HTML_BACKENDS, default='lxml',
+                        help='HTML parsing backend (default: lxml)')
+    parser.add_argument('--cache-dir', default=ParseCache.DEFAULT_DIR,
+                        help=f'Directory for the incremental parse cache and search index '
+                             f'(default: {ParseCache.DEFAULT_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every file again and do not use the parse cache')
+    # FacebookMessageVisualizer.SCATTER_MODES, spelled out so --help does not import dash
+    parser.add_argument('--scatter-mode', choices=('auto', 'points', 'density'), default='auto',
+                        help='Draw the main chart as points, a density grid, or pick by message count (default: auto)')
+    # FigureCache.DEFAULT_SIZE, spelled out for the same reason
+    parser.add_argument('--figure-cache-size', type=int, default=128,
+                        help='Dashboard responses kept in the server-side figure cache, 0 to disable (default: 128)')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Number of processes used to parse files (default: 1)')
+    parser.add_argument('--prefetch-depth', type=int, default=FilePrefetcher.DEFAULT_DEPTH,
+                        help=f'Files read ahead of the parser, 0 to read each file when it is parsed (default: {FilePrefetcher.DEFAULT_DEPTH})')
+    parser.add_argument('--read-ahead', type=int, default=FilePrefetcher.DEFAULT_READ_AHEAD // (1024 * 1024),
+                        help=f'Maximum MB read ahead of the parser (default: {FilePrefetcher.DEFAULT_READ_AHEAD // (1024 * 1024)})')
+    parser.add_argument('--readers', type=int, default=FilePrefetcher.DEFAULT_READERS,
+                        help=f'Threads reading files ahead of the parser (default: {FilePrefetcher.DEFAULT_READERS})')
+    parser.add_argument('--report', metavar='FILE', help='Write a JSON report of parse timings, throughput and errors')
+    parser.add_argument('--profile', metavar='FILE', help='Profile parsing with cProfile and write the stats to FILE')
+    parser.add_argument('--trace-memory', action='store_true', help='Record peak memory while parsing with tracemalloc (slower)')
+    parser.add_argument('--export', metavar='DIR', help='Write the messages to a Parquet dataset partitioned by year (needs pyarrow)')
+    parser.add_argument('--export-by-thread', action='store_true', help='Also partition the exported dataset by thread')
+    parser.add_argument('--snapshot', metavar='FILE',
+                        help='Write the messages to a memory-mapped Arrow file for serving with wsgi.py (needs pyarrow)')
+    parser.add_argument('--dataset', action='store_true',
+                        help='Treat input_path as a dataset written by --export instead of a Facebook export')
+    parser.add_argument('--since', help='With --dataset, only load messages from this date on (YYYY-MM-DD)')
+    parser.add_argument('--until', help='With --dataset, only load messages before this date (YYYY-MM-DD)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep parsing new and changed message files into the running dashboard')
+    parser.add_argument('--watch-interval', type=float, default=ExportWatcher.DEFAULT_INTERVAL,
+                        help=f'Seconds between checks for new message files with --watch (default: {ExportWatcher.DEFAULT_INTERVAL:g})')
     
     args = parser.parse_args()
     
-    input_path = Path(args.input_path)
+    if (args.export or args.dataset or args.snapshot) and not MessageDataset.available():
+        parser.error("--export, --snapshot and --dataset require pyarrow (pip install pyarrow)")
+    
+    if args.dataset and len(args.input_path) > 1:
+        parser.error("--dataset takes a single input path")
+    if args.watch and (args.dataset or args.parse_only):
+        parser.error("--watch needs a Facebook export and the visualizer, not --dataset or --parse-only")
+    input_paths = [Path(path) for path in args.input_path]
+    input_path = input_paths[0] if len(input_paths) == 1 else input_paths
     
-    # Parse HTML files directly
-    print(f"Parsing HTML files from {input_path}")
-    message_parser = FacebookMessageParser()
-    message_parser.parse_directory(input_path)
+    if args.dataset:
+        # Reload a previous export without touching the message files
+        print(f"Loading message dataset from {input_path}")
+        dataset = MessageDataset(input_path)
+        df = dataset.to_dataframe(start=args.since, end=args.until)
+        stats = dataset.get_summary_stats(df)
+        participants = dataset.participants
+        search_index = None if args.parse_only else MessageSearchIndex.from_dataframe(df)
+    else:
+        # Parse message files directly
+        print(f"Parsing message files from {', '.join(map(str, input_paths))}")
+        message_parser = FacebookMessageParser(backend=args.backend,
+                                               cache_dir=None if args.no_cache else args.cache_dir,
+                                               search_index=not args.parse_only,
+                                               metrics=ParseMetrics(profile_path=args.profile,
+                                                                    trace_memory=args.trace_memory))
+        message_parser.parse_directory(input_path, workers=args.workers, prefetch_depth=args.prefetch_depth,
+                                       read_ahead=args.read_ahead * 1024 * 1024, readers=args.readers)
+        if args.report:
+            message_parser.metrics.write_report(args.report)
+            print(f"Parse report written to {args.report}")
+        
+        # Convert to DataFrame for analysis and visualization
+        df = message_parser.to_dataframe()
+        stats = message_parser.get_summary_stats()
+        participants = message_parser.participants
+        search_index = message_parser.search_index
     
-    if not message_parser.messages:
+    if df.empty:
         print("No messages found or parsed. Please check your input path.")
         return
     
-    # Convert to DataFrame for analysis and visualization
-    df = message_parser.to_dataframe()
+    if args.export:
+        MessageDataset.write(df, args.export, participants=participants,
+                             partition_by_thread=args.export_by_thread)
+        print(f"Exported {len(df):,} messages to dataset {args.export}")
+    
+    if args.snapshot:
+        MessageMapFile.write(df, args.snapshot, participants=participants, search_index=search_index)
+        print(f"Wrote {len(df):,} messages to {args.snapshot}; serve it with: python wsgi.py {args.snapshot}")
     
     # Display summary statistics
-    stats = message_parser.get_summary_stats()
     print(f"\n=== Summary Statistics ===")
     print(f"Total messages: {stats['total_messages']:,}")
     print(f"Total participants: {stats['total_participants']}")
@@ -744,7 +2745,7 @@ def main():
             print(f"  {participant}: {count:,} messages")
         
         print(f"\nTop 5 conversations by message count:")
-        top_threads = df['thread_title'].value_counts().head()
+        top_threads = top_conversations(df)
         for thread, count in top_threads.items():
             thread_display = thread[:50] + "..." if len(thread) > 50 else thread
             print(f"  {thread_display}: {count:,} messages")
@@ -755,7 +2756,24 @@ def main():
     
     # Start interactive visualization
     print(f"\nStarting interactive visualizer...")
-    visualizer = FacebookMessageVisualizer(df)
+    from fb_message_visualizer import FacebookMessageVisualizer, FigureCache
+    visualizer = FacebookMessageVisualizer(df, scatter_mode=args.scatter_mode,
+                                           search_index=search_index,
+                                           figure_cache=FigureCache(args.figure_cache_size),
+                                           refresh_interval=args.watch_interval if args.watch else None)
+    
+    if args.watch:
+        def refresh(parser, start):
+            visualizer.append_data(parser.to_dataframe(start), search_index=parser.search_index)
+            print(f"Loaded {len(parser.messages) - start:,} new messages: {len(parser.messages):,} in total")
+        
+        watcher = ExportWatcher(message_parser, input_paths, interval=args.watch_interval, on_update=refresh,
+                                workers=args.workers, prefetch_depth=args.prefetch_depth,
+                                read_ahead=args.read_ahead * 1024 * 1024, readers=args.readers)
+        watcher.mark_seen()
+        watcher.start()
+        print(f"Watching {', '.join(map(str, input_paths))} for new messages every {args.watch_interval:g} s")
+    
     visualizer.run(debug=False, port=args.port)
 
 
@@ -0,0 +1,1365 @@
+#!/usr/bin/env python3
+"""
+Facebook Message Dashboard
+
+The interactive Plotly Dash explorer for messages parsed by
+fb_message_processor. It lives in its own module so that parsing, the
+--parse-only CLI and the Parquet export never import plotly or dash.
+
+Features:
+- Filter histograms, date/time density charts and a main scatter plot
+- Cross-filtering through a pre-aggregated cube of message counts
+- Server-side density grid for large selections
+- Full-text search highlighting
+- Server-side LRU cache of built figures, shared by all browser sessions
+- Compact responses: numeric data as typed arrays, gzip on the wire
+"""
+
+import json
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import plotly.graph_objects as go
+import dash
+from dash import dcc, html, Input, Output, State, callback_context
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
+from flask import request
+
+from fb_message_processor import MessageSearchIndex, MessageMapFile, message_fingerprint
+
+
+
+class AggregateCube:
+    """Crossfilter counts of messages by day, hour, weekday, sender, thread and length bin.
+    
+    Day, hour and weekday all follow from the hour a message was sent in,
+    so the time dimensions are kept as counts per (day, hour) cell, of
+    which there are at most 24 a day however many messages there are.
+    Sender, thread and length bin do not collapse like that, so they are
+    kept per message as small integer codes, in three layouts: sorted by
+    time cell, by sender and by thread, each with the offset at which every
+    value's run of messages starts.
+    
+    Every chart is drawn under every filter but its own. Each filter gets a
+    bit, and each value of a layout's key the bits of the filters it
+    fails, so one pass over the runs of the most selective filter counts
+    every chart that does not filter that key (a message counts for a
+    chart if it fails no filter but the chart's own); the charts that do
+    take a second pass. The cost follows what the filters select rather
+    than the size of the export, and charts of time dimensions under time
+    filters alone never touch messages at all.
+    """
+    
+    WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    LENGTH_EDGES = [0, 1, 5, 10, 20, 50, 100, 200, 500, 1000, 5000]
+    LENGTH_LABELS = ['0-1', '1-5', '5-10', '10-20', '20-50', '50-100', '100-200', '200-500', '500-1k', '1k-5k', '5k+']
+    TIME_DIMS = ('day', 'hour', 'weekday')
+    # Per-message dimensions, each also the sort key of a layout except length_bin
+    ROW_DIMS = ('time', 'sender', 'thread', 'length_bin')
+    LAYOUTS = ('time', 'sender', 'thread')
+    # Dimensions with a chart, each drawn under every filter but its own
+    CHARTS = ('sent', 'weekday', 'thread', 'sender', 'length_bin', 'hour', 'day')
+    
+    def __init__(self, df):
+        day_values, hours, senders, threads, thread_titles, length_bins = self._bin(df)
+        self.days, day_codes = np.unique(day_values, return_inverse=True)
+        cell_keys, time_codes = np.unique(day_codes.ravel() * 24 + hours, return_inverse=True)
+        self.senders = senders.categories
+        # Threads are their keys (see FacebookMessageParser.thread_key), shown by title
+        self.threads = threads.categories
+        self.thread_titles = thread_titles
+        
+        codes = {
+            'time': time_codes.ravel().astype(np.int32),
+            'sender': senders.codes,
+            'thread': threads.codes,
+            'length_bin': length_bins,
+        }
+        # Each layout holds every message's codes and DataFrame row, sorted by its key
+        self.layouts = {}
+        for key in self.LAYOUTS:
+            order = np.argsort(codes[key], kind='stable')
+            layout = {dim: values[order] for dim, values in codes.items()}
+            layout['row'] = order.astype(np.int32)
+            self.layouts[key] = layout
+        # Sorted pairs of sender and thread codes, for telling who the main sender is
+        self._pairs = np.unique((senders.codes.astype(np.int64) << 32) | threads.codes)
+        self._index(cell_keys)
+    
+    @classmethod
+    def _bin(cls, df):
+        """Day, hour, sender, thread and length bin of every message in ``df``, and thread titles.
+        
+        Threads are categorical over their keys; the titles are those of
+        the keys, from the first message of each.
+        """
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+        day_values = timestamps.astype('datetime64[D]')
+        hours = (timestamps - day_values).astype('timedelta64[h]').astype(np.int64)
+        # Bins are closed on the left, like pd.cut(..., right=False)
+        lengths = df['content'].str.len().to_numpy()
+        length_bins = (np.searchsorted(cls.LENGTH_EDGES, lengths, side='right') - 1).astype(np.int8)
+        threads = pd.Categorical(df['thread_key'])
+        titles = pd.Categorical(df['thread_title'])
+        codes, first = np.unique(threads.codes, return_index=True)
+        thread_titles = threads.categories.to_numpy(dtype=object, copy=True)
+        thread_titles[codes] = titles.categories.to_numpy(dtype=object)[titles.codes[first]]
+        return (day_values, hours, pd.Categorical(df['sender_name']), threads, pd.Index(thread_titles),
+                length_bins)
+    
+    def _index(self, cell_keys):
+        """Work out sizes, offsets and totals once the days, names, layouts and pairs are set."""
+        self.sizes = {
+            'time': len(cell_keys),
+            'day': len(self.days),
+            'hour': 24,
+            'weekday': 7,
+            'sender': len(self.senders),
+            'thread': len(self.threads),
+            'length_bin': len(self.LENGTH_LABELS),
+        }
+        # Codes of every time cell; 1970-01-01 was a Thursday
+        cell_days = cell_keys // 24
+        self.cell_codes = {
+            'day': cell_days,
+            'hour': cell_keys % 24,
+            'weekday': (self.days.astype(np.int64)[cell_days] + 3) % 7,
+        }
+        # The offset at which every value's run starts in each layout
+        for key, layout in self.layouts.items():
+            offsets = np.zeros(self.sizes[key] + 1, dtype=np.int64)
+            np.cumsum(np.bincount(layout[key], minlength=self.sizes[key]), out=offsets[1:])
+            layout['offsets'] = offsets
+        self.cell_count = np.diff(self.layouts['time']['offsets'])
+        
+        # Unfiltered marginals are what every reset renders, so keep them ready
+        self.totals = {dim: self._count_cells(dim, self.cell_count) for dim in self.TIME_DIMS}
+        for dim in ('sender', 'thread'):
+            self.totals[dim] = np.diff(self.layouts[dim]['offsets'])
+        self.totals['length_bin'] = np.bincount(self.layouts['time']['length_bin'],
+                                                minlength=self.sizes['length_bin']).astype(np.int64)
+        self.main_sender = self._main_sender()
+        self._sent = np.arange(self.sizes['sender']) == self.main_sender
+        self._last_charts = None
+    
+    def appended(self, rows):
+        """A cube over this one's messages followed by those in ``rows``.
+        
+        Only the new messages are binned and sorted, then merged into the
+        layouts. Codes of days and time cells are renumbered when new ones
+        come in between; senders and threads keep theirs, with new names
+        (and the titles of new threads) added at the end.
+        """
+        day_values, hours, senders, threads, thread_titles, length_bins = self._bin(rows)
+        cube = object.__new__(type(self))
+        cube.days = np.union1d(self.days, day_values)
+        day_map = np.searchsorted(cube.days, self.days)
+        old_keys = day_map[self.cell_codes['day']] * 24 + self.cell_codes['hour']
+        new_keys = np.searchsorted(cube.days, day_values) * 24 + hours
+        cell_keys = np.union1d(old_keys, new_keys)
+        cell_map = np.searchsorted(cell_keys, old_keys).astype(np.int32)
+        
+        codes = {'time': np.searchsorted(cell_keys, new_keys).astype(np.int32), 'length_bin': length_bins}
+        for dim, values in (('sender', senders), ('thread', threads)):
+            labels = getattr(self, dim + 's')
+            added = values.categories.difference(labels, sort=False)
+            setattr(cube, dim + 's', labels.append(added))
+            codes[dim] = getattr(cube, dim + 's').get_indexer(values.categories)[values.codes]
+        added = threads.categories.get_indexer(cube.threads[len(self.threads):])
+        cube.thread_titles = self.thread_titles.append(thread_titles[added])
+        
+        cube.layouts = {}
+        for key in self.LAYOUTS:
+            old = dict(self.layouts[key], time=cell_map[self.layouts[key]['time']])
+            order = np.argsort(codes[key], kind='stable')
+            # After the old messages of the same value, as a stable sort of them all would put them
+            positions = np.searchsorted(old[key], codes[key][order], side='right')
+            layout = {}
+            for dim, values in codes.items():
+                merged_type = np.promote_types(old[dim].dtype, values.dtype)
+                layout[dim] = np.insert(old[dim].astype(merged_type, copy=False), positions, values[order])
+            layout['row'] = np.insert(old['row'], positions, (len(self) + order).astype(np.int32))
+            cube.layouts[key] = layout
+        pairs = np.unique((codes['sender'].astype(np.int64) << 32) | codes['thread'])
+        positions = np.searchsorted(self._pairs, pairs)
+        known = np.zeros(len(pairs), dtype=bool)
+        if len(self._pairs):
+            known = self._pairs[np.minimum(positions, len(self._pairs) - 1)] == pairs
+        cube._pairs = np.insert(self._pairs, positions[~known], pairs[~known])
+        cube._index(cell_keys)
+        return cube
+    
+    def __len__(self):
+        return len(self.layouts['time']['row'])
+    
+    def _count_cells(self, dim, cell_count):
+        return np.bincount(self.cell_codes[dim], weights=cell_count, minlength=self.sizes[dim]).astype(np.int64)
+    
+    def chart_counts(self, filters):
+        """Counts for every chart in ``CHARTS``, each under every filter but its own.
+        
+        ``sent`` is counted as ``[received, sent]``, every other dimension
+        over all its codes. The charts of one filter state are drawn by
+        separate callbacks, so the last result is kept for the next caller.
+        """
+        state = json.dumps(filters or {}, sort_keys=True, default=str)
+        cached = self._last_charts
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        
+        fails, bits = self._fails(filters)
+        groups = {dim: ('time' if dim in self.TIME_DIMS else 'sender' if dim == 'sent' else dim, bits.get(dim, 0))
+                  for dim in self.CHARTS}
+        counts = {}
+        if not fails:
+            for group in set(groups.values()):
+                counts[group] = self.cell_count if group[0] == 'time' else self.totals[group[0]]
+        else:
+            # One pass over the runs of the most selective filter serves every chart
+            # but those of its own dimension, which take the runs of the next one
+            keys = self._by_selectivity(fails)
+            own = {group for group in groups.values() if group[1] and group[0] == keys[0]}
+            self._count_pass(keys[0], fails, set(groups.values()) - own, counts)
+            if own and len(fails) > 1:
+                # Either the runs of the next filter, or the first key's own runs
+                # with the charts' filters left to the counts
+                ignore = sum(bit for _, bit in own)
+                first = self._read_cost(keys[0], (fails[keys[0]] & ~np.uint8(ignore)) == 0)
+                second = self._read_cost(keys[1], fails[keys[1]] == 0) if len(keys) > 1 else len(self)
+                if first < second:
+                    self._count_pass(keys[0], fails, own, counts, ignore)
+                else:
+                    self._count_pass(keys[1] if len(keys) > 1 else None, fails, own, counts)
+            elif own:
+                # The first key holds the only filters: mask its totals
+                for key, bit in own:
+                    totals = self.cell_count if key == 'time' else self.totals[key]
+                    counts[key, bit] = np.where(fails[key] & ~np.uint8(bit), 0, totals)
+        
+        charts = {}
+        for dim, group in groups.items():
+            if dim in self.TIME_DIMS:
+                charts[dim] = self._count_cells(dim, counts[group])
+            elif dim == 'sent':
+                charts[dim] = np.array([counts[group][~self._sent].sum(), counts[group][self._sent].sum()], dtype=np.int64)
+            else:
+                charts[dim] = np.asarray(counts[group], dtype=np.int64)
+        self._last_charts = (state, charts)
+        return charts
+    
+    def _count_pass(self, base, fails, groups, counts, ignore=0):
+        """Count ``(key, bit)`` groups over the messages ``base``'s filters keep.
+        
+        A group counts the messages by ``key`` that fail no filter, except
+        maybe the one on ``bit``; filters on ``base`` with a bit in ``ignore``
+        are left to the groups, and a ``base`` of ``None`` reads every
+        message. The filters on ``key`` itself only depend on the value
+        counted, so they are applied to the counts; groups weighted alike
+        share them.
+        """
+        others = [key for key in fails if key != base]
+        keep = None if base is None else (fails[base] & ~np.uint8(ignore)) == 0
+        totals = None
+        if not others and not ignore and self._passing(base, fails[base]) > len(self) // 2:
+            # Fewer messages to count in what the filters leave out
+            keep = ~keep
+            totals = {key: self.cell_count if key == 'time' else self.totals[key] for key, _ in groups}
+        
+        # Messages are weighted by the filters they fail on every other key
+        key_bits = {key: int(np.bitwise_or.reduce(fails[key])) for key in others}
+        weighting = {}
+        for key, bit in groups:
+            rest = tuple(other for other in others if other != key)
+            weighting[key, bit] = (rest, bit & sum(key_bits[other] for other in rest))
+        
+        sums = {(key, weights): np.zeros(self.sizes[key], dtype=np.int64) for (key, _), weights in weighting.items()}
+        for layout, rows, values in self._runs(base, keep):
+            codes = {key: fails[key][layout[key][rows]] for key in others}
+            kept = {}
+            for rest, bit in set(weighting.values()):
+                failed = None
+                for key in rest:
+                    failed = codes[key] if failed is None else failed | codes[key]
+                kept[rest, bit] = None if failed is None else (failed & ~np.uint8(bit)) == 0
+            for key, weights in sums:
+                if key == base and values is not None:
+                    sums[key, weights][values] += self._count_run(layout, rows, values, kept[weights])
+                else:
+                    sums[key, weights] += np.bincount(layout[key][rows], weights=kept[weights],
+                                                      minlength=self.sizes[key]).astype(np.int64)
+        
+        for (key, bit), weights in weighting.items():
+            group = sums[key, weights] if totals is None else totals[key] - sums[key, weights]
+            if key in fails:
+                group = np.where(fails[key] & ~np.uint8(bit), 0, group)
+            counts[key, bit] = group
+    
+    @staticmethod
+    def _count_run(layout, rows, values, kept):
+        """Counts per value of a run of the layout sorted by them, without a bincount."""
+        lengths = np.diff(layout['offsets'][values.start:values.stop + 1])
+        if kept is None:
+            return lengths
+        starts = layout['offsets'][values][lengths > 0] - rows.start
+        counts = np.zeros(len(lengths), dtype=np.int64)
+        counts[lengths > 0] = np.add.reduceat(kept.view(np.uint8), starts, dtype=np.int32)
+        return counts
+    
+    def top(self, dim, n, counts=None):
+        """The ``n`` most frequent senders or threads as ``(code, label, count)`` tuples.
+        
+        ``counts`` are the ones to rank by, such as a ``chart_counts``
+        entry, and default to all messages.
+        """
+        labels = self.senders if dim == 'sender' else self.thread_titles
+        counts = self.totals[dim] if counts is None else counts
+        order = np.argsort(-counts, kind='stable')[:n]
+        return [(int(code), labels[code], int(counts[code])) for code in order if counts[code] > 0]
+    
+    def _main_sender(self):
+        """Code of the sender who appears in the most threads."""
+        if not len(self.senders):
+            return None
+        thread_counts = np.bincount(self._pairs >> 32, minlength=len(self.senders))
+        return int(np.argmax(thread_counts))
+    
+    def main_user(self):
+        """The sender who appears in the most threads."""
+        return self.senders[self.main_sender] if self.main_sender is not None else None
+    
+    def _time_mask(self, dim, selection):
+        """Mask over time cells for a ``day``, ``hour`` or ``weekday`` selection."""
+        codes = self.cell_codes[dim]
+        if dim == 'day':
+            start, end = (pd.Timestamp(value).to_datetime64().astype('datetime64[D]') for value in selection)
+            low = np.searchsorted(self.days, min(start, end), side='left')
+            high = np.searchsorted(self.days, max(start, end), side='right')
+            return (codes >= low) & (codes < high)
+        if dim == 'hour':
+            low, high = min(selection), max(selection)
+            return (codes >= int(np.floor(low))) & (codes < int(np.ceil(high)))
+        allowed = np.zeros(7, dtype=bool)
+        allowed[list(selection)] = True
+        return allowed[codes]
+    
+    def _keep(self, dim, values):
+        """Mask over the values of ``dim``'s key that one filter keeps, or ``None``.
+        
+        ``sent`` takes ``'Sent'``/``'Received'`` and masks senders, ``day`` a
+        ``[start, end]`` date range, ``hour`` a ``[low, high]`` hour range,
+        both masking time cells like ``weekday``, and every other dimension a
+        list of codes.
+        """
+        if not values:
+            return None
+        if dim == 'sent':
+            if set(values) == {'Sent'}:
+                return self._sent
+            if set(values) == {'Received'}:
+                return ~self._sent
+            return None
+        if dim in self.TIME_DIMS:
+            return self._time_mask(dim, values)
+        keep = np.zeros(self.sizes[dim], dtype=bool)
+        keep[list(values)] = True
+        return keep
+    
+    def _fails(self, filters):
+        """The filters as a bit each, and the filters every value of each key fails.
+        
+        Returns ``(fails, bits)``: ``fails`` maps a key of ``ROW_DIMS`` to
+        an array over its values of the OR of the bits of its filters that
+        the value fails, and ``bits`` maps each filtered dimension to its bit.
+        """
+        fails, bits = {}, {}
+        for dim, values in (filters or {}).items():
+            keep = self._keep(dim, values)
+            if keep is None:
+                continue
+            key = 'time' if dim in self.TIME_DIMS else 'sender' if dim == 'sent' else dim
+            bits[dim] = 1 << len(bits)
+            fail = np.where(keep, 0, bits[dim]).astype(np.uint8)
+            fails[key] = fails[key] | fail if key in fails else fail
+        return fails, bits
+    
+    def _by_selectivity(self, fails):
+        """The filtered keys with a layout, the one whose filters keep fewest messages first.
+        
+        ``[None]`` when only ``length_bin`` is filtered, which has no layout.
+        """
+        keys = sorted((key for key in fails if key in self.layouts), key=lambda key: self._passing(key, fails[key]))
+        return keys or [None]
+    
+    def _passing(self, key, fail):
+        """Number of messages that fail none of ``key``'s filters."""
+        counts = self.cell_count if key == 'time' else self.totals[key]
+        return int(counts[fail == 0].sum())
+    
+    # Up to this many runs are read one by one as views, more are gathered at once
+    MAX_RUNS = 64
+    # Gathering costs about as much again as reading the messages
+    GATHER_COST = 2
+    
+    def _read_cost(self, key, keep):
+        """Rough cost of reading the runs of ``keep`` from ``key``'s layout."""
+        counts = self.cell_count if key == 'time' else self.totals[key]
+        runs = np.count_nonzero(np.diff(keep.view(np.int8), prepend=0) == 1)
+        return int(counts[keep].sum()) * (self.GATHER_COST if runs > self.MAX_RUNS else 1)
+    
+    def _runs(self, key, keep):
+        """Yield ``(layout, rows, values)`` pieces of ``key``'s layout covering the values in ``keep``.
+        
+        ``rows`` is a slice of the messages of the consecutive ``values`` (a
+        slice too) such as the time cells of a date range, or an array of
+        positions, with ``values`` ``None``, when the runs are many. A ``key``
+        of ``None`` reads the whole time layout.
+        """
+        if key is None:
+            yield self.layouts['time'], slice(0, len(self)), None
+            return
+        layout = self.layouts[key]
+        offsets = layout['offsets']
+        values = np.flatnonzero(keep)
+        if not len(values):
+            return
+        breaks = np.flatnonzero(np.diff(values) != 1) + 1
+        starts, stops = values[np.r_[0, breaks]], values[np.r_[breaks - 1, len(values) - 1]] + 1
+        if len(starts) <= self.MAX_RUNS:
+            for start, stop in zip(starts, stops):
+                yield layout, slice(int(offsets[start]), int(offsets[stop])), slice(int(start), int(stop))
+        else:
+            run_starts = offsets[values]
+            lengths = offsets[values + 1] - run_starts
+            ends = np.cumsum(lengths)
+            yield layout, np.arange(ends[-1]) + np.repeat(run_starts - (ends - lengths), lengths), None
+    
+    def rows(self, filters):
+        """DataFrame positions of the messages ``filters`` keep, or ``None`` for all."""
+        fails, _ = self._fails(filters)
+        if not fails:
+            return None
+        base = self._by_selectivity(fails)[0]
+        parts = []
+        for layout, rows, _ in self._runs(base, None if base is None else fails[base] == 0):
+            failed = None
+            for key in fails:
+                if key != base:
+                    failed = fails[key][layout[key][rows]] if failed is None else failed | fails[key][layout[key][rows]]
+            parts.append(layout['row'][rows] if failed is None else layout['row'][rows][failed == 0])
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+    
+    def row_mask(self, filters):
+        """Boolean mask over DataFrame rows for ``filters``, or ``None``."""
+        rows = self.rows(filters)
+        if rows is None:
+            return None
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = True
+        return mask
+
+
+MS_PER_DAY = 86_400_000.0
+
+
+class FigureCache:
+    """Size-bounded LRU cache of callback responses (figures and lists of them).
+    
+    Keys are built by the caller from the dataset version and the filter
+    state, so one cache can be shared by every session of a server, and by
+    several visualizers. Thread safe; a response is built outside the lock,
+    so two requests racing for the same key may both build it.
+    """
+    
+    DEFAULT_SIZE = 128
+    
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get_or_build(self, key, build):
+        """Return the cached response for ``key``, calling ``build()`` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        
+        value = build()
+        if self.maxsize <= 0:
+            return value
+        
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+    
+    def clear(self):
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class FacebookMessageVisualizer:
+    """Create interactive visualizations for Facebook message data."""
+    
+    # Filter histograms: graph id, title, height and cube dimension
+    HISTOGRAMS = [
+        ('sent-received-hist', "Received / Sent", '120px', 'sent'),
+        ('weekday-hist', "Week Day", '120px', 'weekday'),
+        ('threads-hist', "Top 10 Threads", '180px', 'thread'),
+        ('senders-hist', "Top 10 Senders", '180px', 'sender'),
+        ('length-hist', "Message Length", '180px', 'length_bin'),
+    ]
+    # Charts whose box selection filters by date and/or hour
+    BRUSHES = ['date-density', 'time-density', 'main-scatter']
+    
+    # 'auto' draws points up to SCATTER_POINT_LIMIT messages and a density grid above
+    SCATTER_MODES = ('auto', 'points', 'density')
+    SCATTER_POINT_LIMIT = 10000
+    DENSITY_X_BINS = 400
+    DENSITY_Y_BINS = 144  # 10 minute rows over a full day
+    
+    # Callback responses at least this large are gzipped for clients that accept it
+    COMPRESS_MIN_BYTES = 1024
+    COMPRESS_LEVEL = 6
+    
+    def __init__(self, df, scatter_mode='auto', search_index=None, figure_cache=None, fingerprint=None,
+                 refresh_interval=None):
+        if scatter_mode not in self.SCATTER_MODES:
+            raise ValueError(f"Unknown scatter mode: {scatter_mode} (expected one of {', '.join(self.SCATTER_MODES)})")
+        self.scatter_mode = scatter_mode
+        # Built figures, keyed by dataset_version and filter state
+        self.figure_cache = figure_cache if figure_cache is not None else FigureCache()
+        # Seconds between browsers checking for new data (see set_data), or None for fixed data
+        self.refresh_interval = refresh_interval
+        self._data_lock = threading.Lock()
+        self.set_data(df, search_index=search_index, fingerprint=fingerprint)
+        
+        self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])  # Dark theme
+        self.setup_layout()
+        self.setup_callbacks()
+        # Cache counters, for keeping an eye on a server shared by several people
+        self.app.server.add_url_rule('/_figure-cache', 'figure-cache', self.figure_cache.stats)
+        
+        # Response size of every callback, before and after compression
+        self._payload_stats = {}
+        self._payload_lock = threading.Lock()
+        self.app.server.after_request(self._compress_response)
+        self.app.server.add_url_rule('/_payload-stats', 'payload-stats', self.payload_stats)
+    
+    def set_data(self, df, search_index=None, fingerprint=None):
+        """Load the messages to show, replacing any shown before.
+        
+        Safe to call from another thread while the app is serving, e.g. from
+        an ExportWatcher: everything is built before it is swapped in, so
+        requests keep being answered from the old data meanwhile. Rows may
+        only be appended to the previous ``df``, never reordered, since a
+        request can straddle the swap. Open dashboards pick up the new data
+        on their next refresh, see ``refresh_interval``. To add rows to those
+        shown, ``append_data`` is much cheaper.
+        """
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+        epoch_days = timestamps.astype('datetime64[D]').astype(np.int64)
+        minutes = timestamps.astype('datetime64[m]').astype(np.int64)
+        # Hover index: minutes since the epoch in sorted order, with their row positions
+        hover_order = np.argsort(minutes, kind='stable')
+        
+        # All histograms and density charts are served from this cube
+        cube = AggregateCube(df)
+        
+        digest = hashlib.blake2b((fingerprint or message_fingerprint(df)).encode(), digest_size=16)
+        digest.update(self.scatter_mode.encode())
+        self._version_base = digest.hexdigest()
+        self._swap(df, cube, epoch_days, minutes, hover_order, minutes[hover_order], search_index,
+                   self._version_base)
+    
+    def append_data(self, rows, search_index=None):
+        """Show the messages in ``rows`` after those shown so far.
+        
+        Like ``set_data`` for the combined messages, but only the new rows
+        are binned and sorted into the cube and the hover index, and the
+        dataset version counts rows rather than hashing them all again.
+        ``search_index`` must cover the combined rows.
+        """
+        if not len(self.df):
+            return self.set_data(rows, search_index=search_index)
+        if not len(rows):
+            return
+        
+        timestamps = rows['timestamp'].to_numpy(dtype='datetime64[ns]')
+        new_days = timestamps.astype('datetime64[D]').astype(np.int64)
+        new_minutes = timestamps.astype('datetime64[m]').astype(np.int64)
+        epoch_days = np.concatenate([self._scatter_days + np.int64(self._first_day), new_days])
+        minutes = np.concatenate([epoch_days[:len(self.df)] * (24 * 60) + self._scatter_minutes, new_minutes])
+        # After old messages of the same minute, as a stable sort of them all would put them
+        order = np.argsort(new_minutes, kind='stable')
+        positions = np.searchsorted(self._hover_keys, new_minutes[order], side='right')
+        hover_order = np.insert(self._hover_order, positions, len(self.df) + order)
+        hover_keys = np.insert(self._hover_keys, positions, new_minutes[order])
+        
+        df = self._concat(self.df, rows)
+        self._swap(df, self.cube.appended(rows), epoch_days, minutes, hover_order, hover_keys, search_index,
+                   f"{self._version_base}+{len(df)}")
+    
+    @staticmethod
+    def _concat(df, rows):
+        """``df`` followed by ``rows``, with the columns of ``rows``.
+        
+        Categories are combined in order, so the codes of ``df`` stay as
+        they are, and derived columns are left to be derived again.
+        """
+        columns = {}
+        for name in rows.columns:
+            old, new = df[name], rows[name]
+            if isinstance(old.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+                columns[name] = union_categoricals([old, new])
+            else:
+                columns[name] = pd.concat([old, new], ignore_index=True)
+        return type(rows)(columns)
+    
+    def _swap(self, df, cube, epoch_days, minutes, hover_order, hover_keys, search_index, version):
+        """Swap in new messages, given their days and minutes since the epoch."""
+        # Day (from the first one) and minute of day of every message, for density
+        # binning; a message counts at the middle of its day so any zoom into that
+        # day keeps it
+        first_day = int(epoch_days.min()) if len(epoch_days) else 0
+        scatter_days = (epoch_days - first_day).astype(np.int32)
+        scatter_minutes = (minutes % (24 * 60)).astype(np.int16)
+        
+        with self._data_lock:
+            self.df = df
+            # Rows of the index must line up with df; built on first search if not given
+            self.search_index = search_index
+            self._search_results = {}
+            self._first_day = first_day
+            self._n_days = int(scatter_days.max()) + 1 if len(scatter_days) else 1
+            self._scatter_days = scatter_days
+            self._scatter_minutes = scatter_minutes
+            # Point coordinates as sent to the browser: midnight of the day in epoch
+            # milliseconds (a date axis reads numbers as such) and float32 hours,
+            # which plotly ships as base64 typed arrays instead of JSON lists
+            self._scatter_x = epoch_days * MS_PER_DAY
+            self._scatter_hours = (scatter_minutes / 60).astype(np.float32)
+            self._hover_order = hover_order
+            self._hover_keys = hover_keys
+            self.cube = cube
+            self.main_user = cube.main_user()
+            # Last, so no figure is cached under the new version from old data; the
+            # version is part of every figure cache key
+            self.dataset_version = version
+    
+    def setup_layout(self):
+        """Setup the Dash app layout similar to FBMessage."""
+        
+        # Calculate some basic stats
+        total_messages = len(self.df)
+        total_participants = self.df['sender_name'].nunique()
+        date_range = f"{self.df['timestamp'].min():%Y-%m-%d} to {self.df['timestamp'].max():%Y-%m-%d}"
+        
+        self.app.layout = html.Div([
+            # Header
+            html.Div([
+                html.H1("FBMessage Explorer", style={
+                    'color': '#ffffff', 'textAlign': 'center', 'margin': '10px',
+                    'fontFamily': 'Nunito, sans-serif'
+                }),
+                html.Button("Reset All Filters", id="reset-btn", style={
+                    'float': 'right', 'margin': '10px', 'backgroundColor': '#2c7bb6',
+                    'color': 'white', 'border': 'none', 'padding': '8px 16px', 'borderRadius': '4px'
+                }),
+                dcc.Input(id='search-box', type='search', debounce=True,
+                          placeholder='Search messages: words, "phrases", prefix*', style={
+                    'float': 'right', 'margin': '10px', 'width': '280px', 'padding': '6px',
+                    'backgroundColor': '#404040', 'color': '#ffffff', 'border': 'none', 'borderRadius': '4px'
+                }),
+                html.Span(id='search-status', style={'float': 'right', 'margin': '16px 4px', 'color': '#fdae61'})
+            ], style={'backgroundColor': '#303030', 'padding': '10px'}),
+            
+            # Main layout container
+            html.Div([
+                # Left side - Time density chart
+                html.Div([
+                    dcc.Graph(
+                        id='time-density',
+                        style={'height': '70vh', 'width': '100%'},
+                        config={'displayModeBar': False}
+                    )
+                ], style={
+                    'width': '11%', 'display': 'inline-block', 'verticalAlign': 'top',
+                    'backgroundColor': '#303030'
+                }),
+                
+                # Center - Main scatter plot
+                html.Div([
+                    dcc.Graph(
+                        id='main-scatter',
+                        style={'height': '70vh', 'width': '100%'},
+                        # Dragging brushes; the wheel zooms, which re-bins the density grid
+                        config={'displayModeBar': False, 'scrollZoom': True}
+                    )
+                ], style={
+                    'width': '58%', 'display': 'inline-block', 'verticalAlign': 'top',
+                    'backgroundColor': '#303030'
+                }),
+                
+                # Right side - Filter histograms
+                html.Div([
+                    html.Div([
+                        html.Div([
+                            html.H6(title, style={'color': '#ffffff', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6', 'paddingLeft': '8px'}),
+                            dcc.Graph(
+                                id=graph_id,
+                                style={'height': height},
+                                config={'displayModeBar': False}
+                            )
+                        ], style={'backgroundColor': '#353535', 'margin': '8px', 'borderLeft': '6px solid #2c7bb6'})
+                        for graph_id, title, height, _ in self.HISTOGRAMS
+                    ], id='filter-histograms')
+                ], style={
+                    'width': '30%', 'display': 'inline-block', 'verticalAlign': 'top',
+                    'backgroundColor': '#303030', 'height': '70vh', 'overflowY': 'scroll'
+                }),
+            ], style={'margin': '0px'}),
+            
+            # Bottom row
+            html.Div([
+                # Date density chart
+                html.Div([
+                    dcc.Graph(
+                        id='date-density',
+                        style={'height': '20vh', 'width': '100%'},
+                        config={'displayModeBar': False}
+                    )
+                ], style={
+                    'width': '69%', 'display': 'inline-block', 'verticalAlign': 'top',
+                    'marginLeft': '11%', 'backgroundColor': '#303030'
+                }),
+                
+                # Message displayer
+                html.Div([
+                    html.H4("Message Details", style={'color': '#ffffff', 'margin': '10px'}),
+                    html.Div(id='message-details', style={
+                        'color': '#ffffff', 'padding': '10px', 'fontSize': '12px',
+                        'fontFamily': 'monospace'
+                    })
+                ], style={
+                    'width': '30%', 'display': 'inline-block', 'verticalAlign': 'top',
+                    'backgroundColor': '#353535', 'height': '20vh', 'overflowY': 'scroll'
+                }),
+            ], style={'margin': '0px'}),
+            
+            # Current cross-filter selection, see apply_selection
+            dcc.Store(id='clicked-filters', data={}),
+            
+            # Version of the data the figures show, checked for updates while data is live
+            dcc.Store(id='data-version', data=self.dataset_version),
+            dcc.Interval(id='data-refresh', interval=(self.refresh_interval or 60) * 1000,
+                         disabled=self.refresh_interval is None),
+            
+        ], style={'backgroundColor': '#303030', 'margin': '0px', 'height': '100vh'})
+    
+    def setup_callbacks(self):
+        """Setup Dash callbacks for interactivity."""
+        
+        # Any click, brush or reset updates the shared filter state
+        @self.app.callback(
+            Output('clicked-filters', 'data'),
+            [Input('reset-btn', 'n_clicks')]
+            + [Input(graph_id, 'clickData') for graph_id, _, _, _ in self.HISTOGRAMS]
+            + [Input(graph_id, 'selectedData') for graph_id in self.BRUSHES],
+            State('clicked-filters', 'data')
+        )
+        def update_filters(*args):
+            filters = args[-1] or {}
+            if not callback_context.triggered:
+                return filters
+            
+            trigger = callback_context.triggered[0]
+            source_id = trigger['prop_id'].split('.')[0]
+            if source_id == 'reset-btn':
+                return {}
+            return self.apply_selection(filters, source_id, trigger['value'])
+        
+        # New data was loaded (see set_data): every chart below depends on data-version
+        @self.app.callback(
+            Output('data-version', 'data'),
+            Input('data-refresh', 'n_intervals'),
+            State('data-version', 'data')
+        )
+        def check_data_version(_, version):
+            if version == self.dataset_version:
+                raise PreventUpdate
+            return self.dataset_version
+        
+        # Filter histograms
+        @self.app.callback(
+            [Output(graph_id, 'figure') for graph_id, _, _, _ in self.HISTOGRAMS],
+            [Input('clicked-filters', 'data'), Input('data-version', 'data')]
+        )
+        def create_filter_histograms(filters, _):
+            return self.cached_response('histograms', lambda: [
+                self.create_histogram_figure(self.histogram_data(dim, filters), 'category', 'count')
+                for _, _, _, dim in self.HISTOGRAMS
+            ], filters)
+        
+        # Main scatter plot, re-binned on zoom when drawn as a density grid
+        @self.app.callback(
+            Output('main-scatter', 'figure'),
+            [Input('clicked-filters', 'data'), Input('main-scatter', 'relayoutData'),
+             Input('search-box', 'value'), Input('data-version', 'data')]
+        )
+        def update_main_scatter(filters, relayout_data, query, _):
+            triggered = [t['prop_id'] for t in callback_context.triggered]
+            if triggered == ['main-scatter.relayoutData']:
+                is_zoom = any(key.startswith(('xaxis.', 'yaxis.')) for key in (relayout_data or {}))
+                if not is_zoom or not self.uses_density(filters):
+                    raise PreventUpdate
+            return self.cached_response(
+                'main-scatter', lambda: self.create_main_scatter_plot(filters, relayout_data, query),
+                filters, self.scatter_viewport(relayout_data), (query or '').strip()
+            )
+        
+        # Number of search matches
+        @self.app.callback(
+            Output('search-status', 'children'),
+            [Input('search-box', 'value'), Input('data-version', 'data')]
+        )
+        def update_search_status(query, _):
+            matches = self.search_rows(query)
+            return "" if matches is None else f"{len(matches):,} matches"
+        
+        # Time density chart
+        @self.app.callback(
+            Output('time-density', 'figure'),
+            [Input('clicked-filters', 'data'), Input('data-version', 'data')]
+        )
+        def update_time_density(filters, _):
+            return self.cached_response('time-density', lambda: self.create_time_density_plot(filters), filters)
+        
+        # Date density chart
+        @self.app.callback(
+            Output('date-density', 'figure'),
+            [Input('clicked-filters', 'data'), Input('data-version', 'data')]
+        )
+        def update_date_density(filters, _):
+            return self.cached_response('date-density', lambda: self.create_date_density_plot(filters), filters)
+        
+        # Message details on hover
+        @self.app.callback(
+            Output('message-details', 'children'),
+            [Input('main-scatter', 'hoverData')],
+            [State('clicked-filters', 'data')]
+        )
+        def display_hover_data(hoverData, filters):
+            if hoverData is None:
+                return "Hover over a message dot to see details"
+            
+            point = hoverData['points'][0]
+            # Points carry their row; density cells, which are sent without
+            # one, are resolved through the index among the filtered messages
+            row = point.get('customdata')
+            if row is None:
+                row = self.nearest_message(point['x'], point['y'], self.cube.rows(filters))
+            
+            if row is not None:
+                msg = self.df.iloc[row]
+                return html.Div([
+                    html.P(f"Thread: {msg['thread_title'][:50]}...", style={'margin': '2px'}),
+                    html.P(f"Sender: {msg['sender_name']}", style={'margin': '2px'}),
+                    html.P(f"Time: {msg['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}", style={'margin': '2px'}),
+                    html.P(f"Message: {msg['content'][:100]}...", style={'margin': '2px', 'wordWrap': 'break-word'})
+                ])
+            
+            return "No message found"
+    
+    def get_main_user(self):
+        """Identify the main user (appears in most threads)."""
+        return self.main_user
+    
+    def cached_response(self, name, build, *state):
+        """Serve callback ``name`` for ``state`` from the figure cache."""
+        key = (self.dataset_version, name, json.dumps(state, sort_keys=True, default=str))
+        return self.figure_cache.get_or_build(key, build)
+    
+    def apply_selection(self, filters, source_id, event):
+        """Return the filter state after a click or brush on ``source_id``.
+        
+        Clicking a histogram bar toggles that category; brushing a density
+        chart or the scatter plot sets a date and/or hour range, and clearing
+        the brush removes it.
+        """
+        filters = dict(filters or {})
+        histogram_dims = {graph_id: dim for graph_id, _, _, dim in self.HISTOGRAMS}
+        
+        if source_id in histogram_dims:
+            if not event or not event.get('points'):
+                return filters
+            dim = histogram_dims[source_id]
+            code = event['points'][0]['customdata']
+            selection = list(filters.get(dim, []))
+            if code in selection:
+                selection.remove(code)
+            else:
+                selection.append(code)
+            if selection:
+                filters[dim] = selection
+            else:
+                filters.pop(dim, None)
+            return filters
+        
+        brush = (event or {}).get('range') or {}
+        if source_id in ('date-density', 'main-scatter'):
+            filters.pop('day', None)
+            if brush.get('x'):
+                filters['day'] = brush['x']
+        if source_id in ('time-density', 'main-scatter'):
+            filters.pop('hour', None)
+            if brush.get('y'):
+                filters['hour'] = brush['y']
+        return filters
+    
+    def histogram_data(self, dim, filters=None):
+        """Bars for one filter histogram, counted under every other filter."""
+        counts = self.cube.chart_counts(filters)[dim]
+        selected = (filters or {}).get(dim, [])
+        
+        if dim == 'sent':
+            bars = [('Received', 'Received', counts[0]), ('Sent', 'Sent', counts[1])]
+        elif dim == 'weekday':
+            bars = [(code, day[:3], count)
+                    for code, (day, count) in enumerate(zip(AggregateCube.WEEKDAYS, counts))]
+        elif dim == 'length_bin':
+            bars = [(code, label, count)
+                    for code, (label, count) in enumerate(zip(AggregateCube.LENGTH_LABELS, counts))]
+        else:
+            bars = [(code, label[:15] + "..." if len(label) > 15 else label, count)
+                    for code, label, count in self.cube.top(dim, 10, counts)]
+        
+        return [{'category': label, 'count': int(count), 'code': code, 'selected': code in selected}
+                for code, label, count in bars]
+    
+    def create_histogram_figure(self, data, x_col, y_col):
+        """Create a horizontal histogram figure with FBMessage styling."""
+        if not data:
+            return go.Figure()
+        
+        # Once a category is selected, the others are greyed out
+        any_selected = any(d.get('selected') for d in data)
+        colors = ['#2c7bb6' if d.get('selected') or not any_selected else '#5a5a5a' for d in data]
+        
+        # Bars are placed by position, since two threads can have the same title
+        labels = [d[x_col] for d in data]
+        fig = go.Figure(data=[
+            go.Bar(
+                y=list(range(len(data))),
+                x=[d[y_col] for d in data],
+                customdata=[d.get('code') for d in data],
+                orientation='h',
+                marker=dict(color=colors),
+                text=[d[y_col] for d in data],
+                hovertext=labels,
+                textposition='outside',
+                textfont=dict(color='#A0A0A0', size=10),
+                hovertemplate='<b>%{hovertext}</b><br>Count: %{x}<extra></extra>'
+            )
+        ])
+        
+        fig.update_layout(
+            plot_bgcolor='#353535',
+            paper_bgcolor='#353535',
+            font=dict(color='#A0A0A0', size=10),
+            margin=dict(l=80, r=30, t=10, b=30),
+            xaxis=dict(
+                showgrid=False,
+                showline=False,
+                showticklabels=False,
+                color='#A0A0A0'
+            ),
+            yaxis=dict(
+                showgrid=False,
+                showline=False,
+                color='#A0A0A0',
+                tickfont=dict(size=9),
+                tickmode='array',
+                tickvals=list(range(len(data))),
+                ticktext=labels
+            ),
+            showlegend=False,
+            height=None
+        )
+        
+        return fig
+    
+    def search_rows(self, query):
+        """Row positions matching a search box query, or ``None`` for no query."""
+        if not query or not query.strip():
+            return None
+        if self.search_index is None:
+            self.search_index = MessageSearchIndex.from_dataframe(self.df)
+        if query not in self._search_results:
+            # Typing produces many one-off queries, so keep only recent ones
+            if len(self._search_results) >= 32:
+                self._search_results.clear()
+            rows = self.search_index.search(query)
+            # A live index may already hold rows that df does not have yet
+            self._search_results[query] = rows[rows < len(self.df)]
+        return self._search_results[query]
+    
+    def nearest_message(self, date, hour, rows=None):
+        """Row position of the message closest in time to a chart position.
+        
+        ``date`` is the x value and ``hour`` the fractional hour on the y
+        axis. ``rows`` limits the search to the filtered rows (see
+        ``AggregateCube.rows``), which are scanned; without it this is a
+        binary search over the sorted minute index, so O(log n).
+        """
+        if not len(self._hover_keys):
+            return None
+        # Date axes report positions as strings, but accept epoch milliseconds too
+        day = (pd.Timestamp(date, unit='ms') if isinstance(date, (int, float)) else pd.Timestamp(date)).normalize()
+        key = (day - pd.Timestamp(0)) // pd.Timedelta(minutes=1) + int(round(float(hour) * 60))
+        
+        if rows is not None:
+            if not len(rows):
+                return None
+            keys = ((self._scatter_days[rows].astype(np.int64) + self._first_day) * (24 * 60)
+                    + self._scatter_minutes[rows])
+            return int(rows[np.argmin(np.abs(keys - key))])
+        
+        pos = int(np.searchsorted(self._hover_keys, key))
+        # The nearest key is either the insertion point or the one before it
+        candidates = [i for i in (pos - 1, pos) if 0 <= i < len(self._hover_keys)]
+        nearest = min(candidates, key=lambda i: abs(int(self._hover_keys[i]) - key))
+        return int(self._hover_order[nearest])
+    
+    def uses_density(self, filters=None, rows=None):
+        """Whether the main scatter renders as a density grid for ``filters``.
+        
+        ``rows`` are the filtered rows (see ``AggregateCube.rows``) when the
+        caller has them already.
+        """
+        if self.scatter_mode != 'auto':
+            return self.scatter_mode == 'density'
+        if rows is None and filters:
+            rows = self.cube.rows(filters)
+        n_rows = len(self.df) if rows is None else len(rows)
+        return n_rows > self.SCATTER_POINT_LIMIT
+    
+    @staticmethod
+    def scatter_viewport(relayout_data):
+        """Visible ``(day_start, day_end, minute_start, minute_end)`` from a zoom event.
+        
+        Days are counted from the epoch; ``None`` means the full extent of
+        an axis, which is also what an autorange (double click) event gives.
+        """
+        relayout_data = relayout_data or {}
+        
+        def axis_range(axis):
+            if f'{axis}.range[0]' in relayout_data:
+                return relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+            return relayout_data.get(f'{axis}.range')
+        
+        x_range, y_range = axis_range('xaxis'), axis_range('yaxis')
+        days = None
+        if x_range:
+            days = sorted((pd.Timestamp(value) - pd.Timestamp(0)) / pd.Timedelta(days=1) for value in x_range)
+        minutes = sorted(float(value) * 60 for value in y_range) if y_range else None
+        return days, minutes
+    
+    def density_grid(self, rows=None, days=None, minutes=None):
+        """Bin messages into a date x minute-of-day count grid.
+        
+        Bins are uniform over the visible ranges, so zooming in re-bins the
+        same number of cells over a smaller area, down to one day by one
+        minute. Returns the ``(n_x, n_y)`` counts and the bin edges.
+        """
+        x0, x1 = days or (self._first_day, self._first_day + self._n_days)
+        y0, y1 = minutes or (0, 24 * 60)
+        y0, y1 = max(y0, 0), min(y1, 24 * 60)
+        n_x = int(min(self.DENSITY_X_BINS, max(1, np.ceil(x1 - x0))))
+        n_y = int(min(self.DENSITY_Y_BINS, max(1, np.ceil(y1 - y0))))
+        
+        # Every message in a day (or minute) falls in the same bin, so bins are
+        # worked out once per day and minute; outside the area is bin n_x (n_y)
+        def bins(values, low, high, n):
+            inside = (values >= low) & (values < high)
+            return np.where(inside, np.minimum(((values - low) * (n / (high - low))).astype(np.int64), n - 1), n)
+        
+        x_bins = bins(self._first_day + np.arange(self._n_days) + 0.5, x0, x1, n_x) * (n_y + 1)
+        y_bins = bins(np.arange(24 * 60, dtype=np.float64), y0, y1, n_y)
+        x, y = self._scatter_days, self._scatter_minutes
+        if rows is not None:
+            x, y = x[rows], y[rows]
+        grid = np.bincount(x_bins[x] + y_bins[y], minlength=(n_x + 1) * (n_y + 1)).reshape(n_x + 1, n_y + 1)
+        grid = grid[:n_x, :n_y]
+        
+        return grid, np.linspace(x0, x1, n_x + 1), np.linspace(y0, y1, n_y + 1)
+    
+    def create_main_scatter_plot(self, filters=None, relayout_data=None, query=None):
+        """Create the main scatter plot showing messages over time.
+        
+        Small selections are drawn point by point. Larger ones are drawn as a
+        density heatmap of every message, binned server-side for the visible
+        area given by ``relayout_data``. Messages matching the search
+        ``query`` are highlighted on top.
+        """
+        fig = go.Figure()
+        
+        rows = self.cube.rows(filters)
+        days = minutes = None
+        use_density = self.uses_density(filters, rows)
+        
+        if use_density:
+            days, minutes = self.scatter_viewport(relayout_data)
+            grid, x_edges, y_edges = self.density_grid(rows, days, minutes)
+            
+            z = grid.T.astype(np.float32)
+            z[z == 0] = np.nan  # Leave empty cells transparent
+            x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+            
+            fig.add_trace(go.Heatmap(
+                x=x_centers * MS_PER_DAY,
+                y=((y_edges[:-1] + y_edges[1:]) / 2 / 60).astype(np.float32),
+                z=z,
+                colorscale=[[0, '#1d4f75'], [0.5, '#2c7bb6'], [1, '#d7ecff']],
+                showscale=False,
+                hovertemplate='Date: %{x|%Y-%m-%d}<br>Time: %{y:.1f}h<br>Messages: %{z}<extra></extra>'
+            ))
+        else:
+            points = np.arange(len(self.df)) if rows is None else rows
+            
+            # Every point carries its row, sent as a typed array, for the details panel
+            fig.add_trace(go.Scatter(
+                x=self._scatter_x[points],
+                y=self._scatter_hours[points],
+                customdata=points.astype(np.int32),
+                mode='markers',
+                marker=dict(
+                    size=3,
+                    color='#2c7bb6',
+                    opacity=0.6
+                ),
+                hovertemplate='Date: %{x|%Y-%m-%d}<br>Time: %{y:.1f}h<extra></extra>',
+                showlegend=False
+            ))
+        
+        matches = self.search_rows(query)
+        if matches is not None:
+            if rows is not None:
+                matches = matches[np.isin(matches, rows)]
+            matches = matches[:self.SCATTER_POINT_LIMIT]
+            # Density cells sit at the middle of their day
+            dates = self._scatter_x[matches]
+            if use_density:
+                dates = dates + MS_PER_DAY / 2
+            
+            fig.add_trace(go.Scatter(
+                x=dates,
+                y=self._scatter_hours[matches],
+                customdata=matches,
+                mode='markers',
+                marker=dict(size=6, color='#fdae61', line=dict(width=1, color='#303030')),
+                hovertemplate='Date: %{x|%Y-%m-%d}<br>Time: %{y:.1f}h<extra>match</extra>',
+                showlegend=False
+            ))
+        
+        fig.update_layout(
+            plot_bgcolor='#303030',
+            paper_bgcolor='#303030',
+            font=dict(color='#A0A0A0'),
+            margin=dict(l=40, r=20, t=10, b=40),
+            xaxis=dict(
+                title="",
+                type='date',  # x values are epoch milliseconds
+                showgrid=True,
+                gridcolor='#404040',
+                color='#A0A0A0',
+                showline=True,
+                linecolor='#A0A0A0'
+            ),
+            yaxis=dict(
+                title="",
+                showgrid=True,
+                gridcolor='#404040',
+                color='#A0A0A0',
+                showline=True,
+                linecolor='#A0A0A0',
+                range=[24, 0],  # Reverse so midnight is at top
+                tickvals=list(range(0, 25, 4)),
+                ticktext=['12AM', '4AM', '8AM', '12PM', '4PM', '8PM', '12AM']
+            ),
+            showlegend=False,
+            height=None,
+            dragmode='select',  # Box selection filters the other charts
+            selectdirection='any'
+        )
+        
+        # Keep the zoomed area that the density grid was binned for
+        if days:
+            fig.update_xaxes(range=list(pd.Timestamp(0) + pd.to_timedelta(days, unit='D')))
+        if minutes:
+            fig.update_yaxes(range=[minutes[1] / 60, minutes[0] / 60])
+        
+        return fig
+    
+    def create_time_density_plot(self, filters=None):
+        """Create time density plot (vertical, showing message count by hour)."""
+        hourly_counts = self.cube.chart_counts(filters)['hour']
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Scatter(
+            x=hourly_counts,
+            y=np.arange(24, dtype=np.int8),
+            fill='tozerox',
+            fillcolor='rgba(44, 123, 182, 0.7)',
+            line=dict(color='#2c7bb6', width=1),
+            mode='lines',
+            showlegend=False
+        ))
+        
+        fig.update_layout(
+            plot_bgcolor='#303030',
+            paper_bgcolor='#303030',
+            font=dict(color='#A0A0A0'),
+            margin=dict(l=40, r=10, t=10, b=20),
+            xaxis=dict(
+                showgrid=False,
+                showticklabels=False,
+                showline=False,
+                color='#A0A0A0'
+            ),
+            yaxis=dict(
+                showgrid=False,
+                color='#A0A0A0',
+                showline=True,
+                linecolor='#A0A0A0',
+                range=[24, 0],  # Reverse so midnight is at top
+                tickvals=list(range(0, 25, 4)),
+                ticktext=['12AM', '4AM', '8AM', '12PM', '4PM', '8PM', '12AM']
+            ),
+            showlegend=False,
+            height=None,
+            dragmode='select',  # Box selection filters the other charts
+            selectdirection='v'
+        )
+        
+        return fig
+    
+    def create_date_density_plot(self, filters=None):
+        """Create date density plot (horizontal, showing message count by date)."""
+        daily_counts = self.cube.chart_counts(filters)['day']
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Scatter(
+            x=self.cube.days.astype('datetime64[ms]').astype(np.int64).astype(np.float64),
+            y=daily_counts,
+            fill='tozeroy',
+            fillcolor='rgba(44, 123, 182, 0.7)',
+            line=dict(color='#2c7bb6', width=1),
+            mode='lines',
+            showlegend=False
+        ))
+        
+        fig.update_layout(
+            plot_bgcolor='#303030',
+            paper_bgcolor='#303030',
+            font=dict(color='#A0A0A0'),
+            margin=dict(l=40, r=20, t=10, b=30),
+            xaxis=dict(
+                type='date',  # x values are epoch milliseconds
+                showgrid=True,
+                gridcolor='#404040',
+                color='#A0A0A0',
+                showline=True,
+                linecolor='#A0A0A0'
+            ),
+            yaxis=dict(
+                showgrid=False,
+                showticklabels=False,
+                showline=False,
+                color='#A0A0A0'
+            ),
+            showlegend=False,
+            height=None,
+            dragmode='select',  # Box selection filters the other charts
+            selectdirection='h'
+        )
+        
+        return fig
+    
+    def _compress_response(self, response):
+        """Gzip callback responses and record their sizes per output."""
+        if not request.path.endswith('/_dash-update-component') or response.direct_passthrough:
+            return response
+        
+        body = response.get_data()
+        compressed = None
+        if len(body) >= self.COMPRESS_MIN_BYTES and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            compressed = gzip.compress(body, compresslevel=self.COMPRESS_LEVEL)
+            response.set_data(compressed)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+        
+        output = (request.get_json(silent=True) or {}).get('output', '?')
+        sent = len(body) if compressed is None else len(compressed)
+        with self._payload_lock:
+            stats = self._payload_stats.setdefault(output, {'calls': 0, 'bytes': 0, 'sent_bytes': 0})
+            stats['calls'] += 1
+            stats['bytes'] += len(body)
+            stats['sent_bytes'] += sent
+            stats['last_bytes'] = len(body)
+            stats['last_sent_bytes'] = sent
+        return response
+    
+    def payload_stats(self):
+        """Response sizes per callback output: JSON bytes and bytes sent."""
+        with self._payload_lock:
+            return {output: dict(stats) for output, stats in self._payload_stats.items()}
+    
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Dashboard over a MessageMapFile, whose columns stay memory-mapped.
+        
+        Search reads the index saved with the file, when there is one.
+        """
+        message_file = MessageMapFile(path)
+        return cls(message_file.to_dataframe(), fingerprint=message_file.fingerprint,
+                   search_index=message_file.search_index(), **kwargs)
+    
+    def run(self, debug=True, port=8050):
+        """Run the Dash app."""
+        print(f"Starting Facebook Message Explorer on http://localhost:{port}")
+        self.app.run(debug=debug, port=port)  # Use app.run instead of app.run_server
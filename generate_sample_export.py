@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Synthetic Facebook Export Generator
+
+Writes a fake Facebook Messenger export in the same layout as a real one
+(messages/inbox/<thread>/message_N.html or .json), so the parser and the
+visualizer can be exercised and benchmarked at any size without real data.
+
+Features:
+- HTML exports with _a6-g message sections, _a72d footers and _a6-q reactions
+- JSON exports in Facebook's own format (sender_name, timestamp_ms, ...)
+- Many threads with skewed sizes, long threads split over several files
+- Unicode names and emoji, reproducible from a seed
+"""
+
+import argparse
+import html
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Eve", "Frank", "Grace", "Heidi",
+               "Ivan", "Judy", "Zoë", "Renée", "José", "Łukasz", "Søren", "Åsa",
+               "Mateo", "Yūki", "Chloé", "Dmitri"]
+LAST_NAMES = ["Smith", "Johnson", "Davis", "Müller", "García", "Nguyen", "O'Brien",
+              "Kowalski", "Rossi", "Novák", "Tanaka", "Dubois"]
+WORDS = ["hey", "hello", "yes", "no", "maybe", "tonight", "tomorrow", "dinner", "coffee",
+         "party", "meeting", "work", "home", "love", "thanks", "sorry", "great", "idea",
+         "see", "you", "later", "what", "time", "are", "we", "going", "to", "the", "café",
+         "movie", "game", "weekend", "photo", "funny", "lol", "ok", "sure", "why", "naïve"]
+EMOJI = ["😂", "❤️", "👍", "😮", "😢", "🎉", "🔥", "🙏", "😊", "🍕"]
+REACTIONS = ["❤", "👍", "😮", "😂", "😢", "😠"]
+
+# Facebook starts a new message_N file every 10,000 messages
+MESSAGES_PER_FILE = 10000
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<div class="_a705"><div class="_a706"><h1>{title}</h1></div></div>
+<section class="_a6-g"><h2>Participants: {participants}</h2></section>
+"""
+
+HTML_MESSAGE = """<section class="_a6-g"><h2 class="_2ph_ _a6-h _a6-i">{sender}</h2><div class="_2ph_ _a6-p"><div><div></div><div>{content}</div><div></div><div></div></div>{reactions}</div><footer class="_a72d-footer"><div class="_a72d">{timestamp}</div></footer></section>
+"""
+
+HTML_FOOTER = """</body>
+</html>
+"""
+
+
+def random_name(rng):
+    """A random participant name."""
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_content(rng):
+    """A random message body, occasionally long or with emoji."""
+    n_words = int(rng.paretovariate(1.5) * 3)
+    text = " ".join(rng.choice(WORDS) for _ in range(min(n_words, 400)))
+    if rng.random() < 0.2:
+        text += " " + rng.choice(EMOJI)
+    return text.capitalize()
+
+
+def split_sizes(total, n_threads, rng):
+    """Split ``total`` messages over threads with a heavy-tailed distribution."""
+    weights = [rng.paretovariate(1.2) for _ in range(n_threads)]
+    scale = total / sum(weights)
+    sizes = [int(w * scale) for w in weights]
+    # Hand out the rounding remainder so the total is exact
+    for i in range(total - sum(sizes)):
+        sizes[i % n_threads] += 1
+    return sizes
+
+
+def thread_messages(rng, participants, count, start, end):
+    """Generate one thread's messages as dicts, newest first like Facebook."""
+    span = (end - start).total_seconds()
+    offsets = sorted((rng.random() * span for _ in range(count)), reverse=True)
+    for offset in offsets:
+        reactions = []
+        if rng.random() < 0.1:
+            reactions = [(rng.choice(REACTIONS), rng.choice(participants))
+                         for _ in range(rng.randint(1, min(3, len(participants))))]
+        yield {
+            'sender': rng.choice(participants),
+            # Facebook exports have whole-second resolution in HTML
+            'timestamp': start + timedelta(seconds=int(offset)),
+            'content': random_content(rng),
+            'reactions': reactions,
+        }
+
+
+def mojibake(text):
+    """Encode text the way Facebook's JSON export does (UTF-8 read as latin-1)."""
+    return text.encode('utf-8').decode('latin-1')
+
+
+def write_html_file(path, title, participants, messages):
+    """Write one message_N.html file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HTML_HEADER.format(title=html.escape(title),
+                                   participants=html.escape(", ".join(participants))))
+        for msg in messages:
+            reactions = ""
+            if msg['reactions']:
+                items = "".join(f"<li>{html.escape(r + actor)}</li>" for r, actor in msg['reactions'])
+                reactions = f'<div><ul class="_a6-q">{items}</ul></div>'
+            f.write(HTML_MESSAGE.format(
+                sender=html.escape(msg['sender']),
+                content=html.escape(msg['content']),
+                reactions=reactions,
+                timestamp=msg['timestamp'].strftime("%b %d, %Y %I:%M:%S %p").lower().capitalize(),
+            ))
+        f.write(HTML_FOOTER)
+
+
+def write_json_file(path, title, participants, messages, thread_path, encode_mojibake=False):
+    """Write one message_N.json file in Facebook's JSON format."""
+    fix = mojibake if encode_mojibake else (lambda text: text)
+    data = {
+        'participants': [{'name': fix(name)} for name in participants],
+        'messages': [
+            {
+                'sender_name': fix(msg['sender']),
+                'timestamp_ms': int(msg['timestamp'].timestamp() * 1000),
+                'content': fix(msg['content']),
+                **({'reactions': [{'reaction': fix(r), 'actor': fix(actor)} for r, actor in msg['reactions']]}
+                   if msg['reactions'] else {}),
+                'is_geoblocked_for_viewer': False,
+            }
+            for msg in messages
+        ],
+        'title': fix(title),
+        'is_still_participant': True,
+        'thread_path': thread_path,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def generate_export(output_dir, n_messages=1000, n_threads=20, fmt='html', seed=0,
+                    messages_per_file=MESSAGES_PER_FILE, encode_mojibake=False,
+                    start=datetime(2012, 1, 1), end=datetime(2025, 7, 31)):
+    """Write a synthetic export under ``output_dir`` and return its file paths.
+
+    ``fmt`` is ``'html'``, ``'json'`` or ``'both'``. With ``encode_mojibake``
+    JSON strings are written the way Facebook does, as UTF-8 bytes read as
+    latin-1.
+    """
+    rng = random.Random(seed)
+    owner = random_name(rng)
+    inbox = Path(output_dir) / "messages" / "inbox"
+    written = []
+
+    for thread_id, size in enumerate(split_sizes(n_messages, n_threads, rng)):
+        if size == 0:
+            continue
+        others = [random_name(rng) for _ in range(1 if rng.random() < 0.7 else rng.randint(2, 8))]
+        participants = [owner] + others
+        title = others[0] if len(others) == 1 else f"Group {thread_id} {rng.choice(EMOJI)}"
+        folder_name = f"{title.split()[0].lower()}_{1000000 + thread_id}"
+        folder = inbox / folder_name
+        folder.mkdir(parents=True, exist_ok=True)
+
+        thread_start = (start + (end - start) * rng.random() * 0.5).replace(microsecond=0)
+        messages = thread_messages(rng, participants, size, thread_start, end)
+
+        # message_1 holds the newest messages
+        for file_index in range(1, (size - 1) // messages_per_file + 2):
+            chunk = [msg for _, msg in zip(range(messages_per_file), messages)]
+            if fmt in ('html', 'both'):
+                path = folder / f"message_{file_index}.html"
+                write_html_file(path, title, participants, chunk)
+                written.append(path)
+            if fmt in ('json', 'both'):
+                path = folder / f"message_{file_index}.json"
+                write_json_file(path, title, participants, chunk,
+                                f"inbox/{folder_name}", encode_mojibake)
+                written.append(path)
+
+    return written
+
+
+def main():
+    """Main function to parse arguments and write the export."""
+    parser = argparse.ArgumentParser(description='Generate a synthetic Facebook Messenger export')
+    parser.add_argument('output_dir', help='Directory to write the export into')
+    parser.add_argument('--messages', '-n', type=int, default=1000, help='Total number of messages (default: 1000)')
+    parser.add_argument('--threads', '-t', type=int, default=20, help='Number of conversations (default: 20)')
+    parser.add_argument('--format', '-f', choices=['html', 'json', 'both'], default='html',
+                        help='Export format (default: html)')
+    parser.add_argument('--messages-per-file', type=int, default=MESSAGES_PER_FILE,
+                        help=f'Messages per message_N file (default: {MESSAGES_PER_FILE})')
+    parser.add_argument('--mojibake', action='store_true',
+                        help="Encode JSON strings like Facebook does (UTF-8 bytes as latin-1)")
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    args = parser.parse_args()
+
+    files = generate_export(args.output_dir, args.messages, args.threads, args.format, args.seed,
+                            args.messages_per_file, args.mojibake)
+    total_size = sum(f.stat().st_size for f in files)
+    print(f"Wrote {len(files)} files ({total_size / 1e6:.1f} MB) to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
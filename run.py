@@ -6,7 +6,7 @@ This script provides a simple way to run the Facebook message processor
 on your data without needing to specify command line arguments.
 """
 
-from fb_message_processor import FacebookMessageParser, FacebookMessageVisualizer
+from fb_message_processor import FacebookMessageParser, ParseCache
 from pathlib import Path
 
 def main():
@@ -32,8 +32,8 @@ def main():
     
     print(f"\nProcessing Facebook data from: {facebook_path}")
     
-    # Parse HTML files
-    parser = FacebookMessageParser()
+    # Parse HTML files, reusing results cached by previous runs
+    parser = FacebookMessageParser(cache_dir=ParseCache.DEFAULT_DIR)
     try:
         parser.parse_directory(facebook_path)
     except Exception as e:
@@ -69,6 +69,9 @@ def main():
         print(f"🌐 Open your browser to: http://localhost:8050")
         print(f"⏹️  Press Ctrl+C to stop the server")
         
+        # Imported here so that parsing does not wait for plotly and dash to load
+        from fb_message_visualizer import FacebookMessageVisualizer
+        
         try:
             visualizer = FacebookMessageVisualizer(df)
             visualizer.run(debug=False, port=8050)
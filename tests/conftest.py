@@ -0,0 +1,7 @@
+"""Make the top-level modules of the repository importable from the tests."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,38 @@
+"""The lxml and BeautifulSoup backends must extract the same from every HTML file."""
+
+from pathlib import Path
+
+import pytest
+
+from fb_message_processor import FacebookMessageParser
+from generate_sample_export import generate_export
+
+
+TEST_INBOX = Path(__file__).resolve().parent.parent / 'test_data' / 'messages' / 'inbox'
+
+pytest.importorskip('bs4')
+
+
+def assert_backends_agree(files):
+    lxml_parser = FacebookMessageParser(backend='lxml')
+    bs4_parser = FacebookMessageParser(backend='bs4')
+    for path in files:
+        expected = bs4_parser.extract_html_file(path)
+        assert expected is not None, path
+        assert expected['messages'], path
+        assert lxml_parser.extract_html_file(path) == expected, path
+        # Bytes handed over by the prefetcher give the same as reading the file
+        assert lxml_parser.extract_html_file(path, path.read_bytes()) == expected, path
+    assert not lxml_parser.metrics.errors and not bs4_parser.metrics.errors
+
+
+def test_test_data_inbox():
+    files = sorted(TEST_INBOX.rglob('*.html'))
+    assert files
+    assert_backends_agree(files)
+
+
+def test_generated_multi_file_export(tmp_path):
+    files = generate_export(tmp_path, n_messages=600, n_threads=5, fmt='html', messages_per_file=50)
+    assert any(path.name == 'message_2.html' for path in files)
+    assert_backends_agree(files)
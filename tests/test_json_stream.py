@@ -0,0 +1,42 @@
+"""The streaming JSON reader must give what json.load gives, whatever the chunk size."""
+
+import io
+import json
+
+import pytest
+
+from fb_message_processor import _JSONStream
+from generate_sample_export import generate_export
+
+
+CHUNK_SIZES = (1, 2, 3, 5, 64, 1 << 16)
+
+
+def stream_load(text, chunk_size):
+    """Rebuild the document from ``_JSONStream.iter_thread_items``."""
+    document = {}
+    for key, value in _JSONStream(io.StringIO(text), chunk_size=chunk_size).iter_thread_items():
+        if key == 'messages':
+            document.setdefault('messages', []).append(value)
+        else:
+            document[key] = value
+    return document
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('text', [
+    '{"messages":[1e5]}',
+    '{"messages": [2.5, -1e-3, 10E+2, 0, -7, true, null], "n": 3.25e1}',
+    '{}',
+])
+def test_numbers_cut_by_chunk_boundaries(text, chunk_size):
+    assert stream_load(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_generated_export_matches_json_load(tmp_path, chunk_size):
+    files = generate_export(tmp_path, n_messages=300, n_threads=4, fmt='json',
+                            messages_per_file=100, encode_mojibake=True)
+    for path in files:
+        text = path.read_text(encoding='utf-8')
+        assert stream_load(text, chunk_size) == json.loads(text)
@@ -0,0 +1,41 @@
+"""MessageFrame's lazy columns must work wherever pandas looks a column up by name."""
+
+import pandas as pd
+import pytest
+
+from fb_message_processor import MessageFrame
+
+
+@pytest.fixture
+def df():
+    return MessageFrame({
+        'timestamp': pd.to_datetime(['2021-01-04 10:00', '2021-01-05 11:30', '2021-01-05 10:05']),
+        'content': ['one two three', 'four', 'five six'],
+        'sender_name': ['Ann', 'Bob', 'Ann'],
+        'reactions': [(), ('👍',), ()],
+    })
+
+
+def test_groupby_derived_column(df):
+    assert df.groupby('hour').size().to_dict() == {10: 2, 11: 1}
+    assert df.groupby(['weekday', 'sender_name'], observed=True).size().to_dict() == {
+        ('Monday', 'Ann'): 1, ('Tuesday', 'Ann'): 1, ('Tuesday', 'Bob'): 1}
+
+
+def test_sort_values_by_derived_column(df):
+    assert df.sort_values('word_count')['content'].tolist() == ['four', 'five six', 'one two three']
+    assert df.sort_values(by=['hour', 'message_length']).index.tolist() == [2, 0, 1]
+
+
+def test_attribute_and_membership(df):
+    assert df.reaction_count.tolist() == [0, 1, 0]
+    assert 'year' in df
+    assert 'year' in df.columns
+    assert 'missing' not in df
+
+
+def test_derived_column_without_source():
+    df = MessageFrame({'content': ['hi']})
+    assert 'hour' not in df
+    with pytest.raises(AttributeError):
+        df.hour
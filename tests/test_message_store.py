@@ -0,0 +1,59 @@
+"""MessageStore must index like the list of message dicts it replaced."""
+
+from datetime import datetime
+
+import pytest
+
+from fb_message_processor import MessageStore
+
+
+def make_messages(n):
+    return [
+        {
+            'thread_title': f"Thread {i % 2}",
+            'sender_name': f"Sender {i % 3}",
+            'timestamp': datetime(2021, 1, 1, 12, i),
+            'content': f"message {i}",
+            'reactions': [f"{i}a", f"{i}b"][:i % 3],
+            'file_path': 'message_1.json',
+        }
+        for i in range(6)
+    ]
+
+
+@pytest.fixture
+def store_and_list():
+    messages = make_messages(6)
+    store = MessageStore()
+    store.extend(messages)
+    return store, messages
+
+
+def test_positive_and_negative_indices(store_and_list):
+    store, messages = store_and_list
+    for i in range(-len(messages), len(messages)):
+        assert store[i] == messages[i]
+
+
+@pytest.mark.parametrize('i', [6, -7, 100])
+def test_index_out_of_range(store_and_list, i):
+    store, _ = store_and_list
+    with pytest.raises(IndexError):
+        store[i]
+
+
+@pytest.mark.parametrize('key', [slice(None), slice(1, 4), slice(-2, None), slice(None, None, -2), slice(4, 1)])
+def test_slices(store_and_list, key):
+    store, messages = store_and_list
+    assert store[key] == messages[key]
+
+
+def test_thread_key_column():
+    messages = make_messages(4)
+    store = MessageStore()
+    store.extend(messages[:2], 'thread_0_1')
+    store.extend(messages[2:4], 'thread_0_2')
+    store.append(messages[0])
+    df = store.to_dataframe()
+    assert df['thread_key'].tolist() == ['thread_0_1'] * 2 + ['thread_0_2'] * 2 + ['Thread 0']
+    assert store[2] == messages[2]
@@ -0,0 +1,22 @@
+"""A JSON export written as Facebook does (mojibake) must parse the same as a clean one."""
+
+import pandas as pd
+
+from fb_message_processor import FacebookMessageParser
+from generate_sample_export import generate_export
+
+
+def parse_export(path, encode_mojibake):
+    generate_export(path, n_messages=2000, n_threads=10, fmt='json', encode_mojibake=encode_mojibake)
+    parser = FacebookMessageParser()
+    parser.parse_directory(path)
+    return parser, parser.to_dataframe().drop(columns=['file_path'])
+
+
+def test_mojibake_export_matches_clean_export(tmp_path):
+    clean_parser, clean = parse_export(tmp_path / 'clean', encode_mojibake=False)
+    parser, repaired = parse_export(tmp_path / 'mojibake', encode_mojibake=True)
+    assert len(clean) == 2000
+    assert clean['reactions'].map(len).sum() > 0
+    pd.testing.assert_frame_equal(repaired, clean)
+    assert parser.participants == clean_parser.participants
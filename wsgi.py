@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Production Server for the Facebook Message Dashboard
+
+Serves a message file written with ``fb_message_processor.py --snapshot``
+(see MessageMapFile) from several gunicorn worker processes. The message
+columns are memory-mapped from that file, so however many workers run they
+share one copy of the messages in the page cache, and the dashboard is built
+once before the workers are forked. Search reads the index saved next to the
+file, which every worker opens read-only.
+
+    python wsgi.py messages.arrow --workers 4 --port 8050
+
+or with gunicorn's own command line, one dashboard per worker:
+
+    gunicorn -w 4 -b 0.0.0.0:8050 'wsgi:create_server("messages.arrow")'
+
+Requires the optional ``gunicorn`` and ``pyarrow`` packages.
+"""
+
+import argparse
+import os
+
+from fb_message_processor import MessageDataset
+
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def create_server(path, scatter_mode='auto', figure_cache_size=128):
+    """Flask server of a dashboard over the message file at ``path``."""
+    from fb_message_visualizer import FacebookMessageVisualizer, FigureCache
+    visualizer = FacebookMessageVisualizer.from_file(path, scatter_mode=scatter_mode,
+                                                     figure_cache=FigureCache(figure_cache_size))
+    return visualizer.app.server
+
+
+def serve(server, host='127.0.0.1', port=8050, workers=DEFAULT_WORKERS, timeout=60):
+    """Run ``server`` under gunicorn with ``workers`` processes forked from this one."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise ImportError("The production server requires gunicorn: pip install gunicorn") from None
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('timeout', timeout)
+            # The server (and the mapped file) is set up once, before forking
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            return server
+
+    DashboardApplication().run()
+
+
+def main():
+    """Main function to parse arguments and start the server."""
+    parser = argparse.ArgumentParser(description='Serve the message dashboard from several worker processes')
+    parser.add_argument('message_file', help='Message file written with fb_message_processor.py --snapshot')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', '-p', type=int, default=8050, help='Port for web server (default: 8050)')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                        help=f'Worker processes (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', type=int, default=60, help='Seconds before a busy worker is restarted (default: 60)')
+    parser.add_argument('--scatter-mode', choices=('auto', 'points', 'density'), default='auto',
+                        help='Draw the main chart as points, a density grid, or pick by message count (default: auto)')
+    parser.add_argument('--figure-cache-size', type=int, default=128,
+                        help='Dashboard responses kept in the figure cache of each worker, 0 to disable (default: 128)')
+
+    args = parser.parse_args()
+
+    if not MessageDataset.available():
+        parser.error("Reading the message file requires pyarrow (pip install pyarrow)")
+
+    print(f"Loading messages from {args.message_file}")
+    server = create_server(args.message_file, scatter_mode=args.scatter_mode,
+                           figure_cache_size=args.figure_cache_size)
+    print(f"Starting Facebook Message Explorer on http://{args.host}:{args.port} with {args.workers} workers")
+    serve(server, host=args.host, port=args.port, workers=args.workers, timeout=args.timeout)
+
+
+if __name__ == "__main__":
+    main()